@@ -0,0 +1,140 @@
+"""HTTP inference service, separate from the Streamlit UI.
+
+Run with: uvicorn api:app --host 0.0.0.0 --port 8000
+"""
+import io
+import time
+
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+
+from batcher import MicroBatcher
+from config import QUALITY_GATE_ENABLED, TTA_VIEWS, USE_WORKER_POOL
+from inference import BATCH_SIZE, decode_all, describe, get_class_names, predict_tops, preprocess_image, top_k
+from model_registry import ModelRegistry
+from prediction_cache import CACHED_TOP_K, PredictionCache, image_key
+from quality_gate import REJECTED
+from tta import ensemble_members, predict_tta
+from worker_pool import InferenceWorkerPool
+
+app = FastAPI(title="LeafSense AI")
+registry = ModelRegistry()
+prediction_cache = PredictionCache()
+# With the worker pool the models live in the workers and this process never imports TensorFlow
+pool = InferenceWorkerPool() if USE_WORKER_POOL else None
+batcher = MicroBatcher(pool.backend if pool else registry.get)
+metrics.register_collector(lambda: metrics.cache_gauges(prediction_cache))
+metrics.register_collector(lambda: metrics.batcher_gauges(batcher))
+
+
+def get_model(crop):
+    if crop not in registry.manifest:
+        raise HTTPException(status_code=404, detail=f"Unknown crop: {crop}")
+    if pool:
+        return pool.backend(crop)
+    try:
+        return registry.get(crop)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"{crop} model file not found at {e.filename}")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"{crop} model failed to load: {e}")
+
+
+def analyze(crop, named_files, k, batch_size):
+    start = time.perf_counter()
+    backend = get_model(crop)
+    class_names = get_class_names(crop)
+    version = registry.variant(crop)
+
+    names, images, failed = decode_all(named_files)
+    tops = predict_tops(backend, images, crop, batch_size=batch_size, cache=prediction_cache, version=version, k=k)
+
+    results = [
+        {"file": name, "predictions": [describe(idx, prob, class_names, crop) for idx, prob in top]}
+        for name, top in zip(names, tops)
+    ]
+    errors = [{"file": name, "error": error} for name, error in failed]
+    return results, errors, (time.perf_counter() - start) * 1000
+
+
+def analyze_one(crop, data, k, tta=False, gate=QUALITY_GATE_ENABLED):
+    # Single images go through the micro-batcher so concurrent requests share a forward pass;
+    # with tta the image's augmented views go through every ensemble member instead
+    start = time.perf_counter()
+    get_model(crop)
+    class_names = get_class_names(crop)
+    version = registry.variant(crop)
+    labels = {"crop": crop, "model": version}
+
+    with metrics.span("decode", **labels):
+        names, images, failed = decode_all([("upload", io.BytesIO(data))], gate=gate)
+    if failed and failed[0][1].startswith(REJECTED):
+        raise HTTPException(status_code=422, detail=failed[0][1])
+    if failed:
+        raise HTTPException(status_code=400, detail=f"Could not decode image: {failed[0][1]}")
+
+    with metrics.span("cache_lookup", **labels):
+        members = 1 if pool else registry.ensemble_size(crop)
+        key = image_key(crop, registry.tta_variant(crop, TTA_VIEWS, members) if tta else version, images[0])
+        top = prediction_cache.get(key)
+    if top is None and tta:
+        with metrics.span("predict_tta", **labels):
+            probs = predict_tta([pool.backend(crop)] if pool else ensemble_members(registry, crop), images[0])
+    elif top is None:
+        with metrics.span("preprocess", **labels):
+            tensor = preprocess_image(images[0])[0]
+        with metrics.span("predict", **labels):
+            try:
+                probs = batcher.predict(crop, tensor)
+            except TimeoutError:
+                raise HTTPException(status_code=503, detail=f"{crop} inference timed out")
+    if top is None:
+        with metrics.span("postprocess", **labels):
+            top = [(int(j), float(probs[j])) for j in top_k(probs)]
+        prediction_cache.put(key, top)
+
+    predictions = [describe(idx, prob, class_names, crop) for idx, prob in top[:k]]
+    return predictions, (time.perf_counter() - start) * 1000
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "crops": registry.crops(),
+        "loaded": [c for c in registry.crops() if registry.is_loaded(c)],
+        "batcher": batcher.stats(),
+        "workers": pool.pids() if pool else [],
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return metrics.render_prometheus()
+
+
+@app.get("/metrics.json")
+async def json_metrics():
+    return metrics.snapshot()
+
+
+@app.post("/predict/{crop}")
+async def predict(crop: str, request: Request, k: int = Query(CACHED_TOP_K, ge=1, le=CACHED_TOP_K), tta: bool = False,
+                  gate: bool = True):
+    # The request body is the raw image file
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty request body, send the image bytes")
+
+    predictions, elapsed_ms = await run_in_threadpool(analyze_one, crop, data, k, tta, gate and QUALITY_GATE_ENABLED)
+    return {"crop": crop, "predictions": predictions, "elapsed_ms": elapsed_ms}
+
+
+@app.post("/predict/{crop}/batch")
+async def predict_batch(crop: str, files: list[UploadFile] = File(...), k: int = Query(CACHED_TOP_K, ge=1, le=CACHED_TOP_K)):
+    named_files = [(f.filename, io.BytesIO(await f.read())) for f in files]
+    results, errors, elapsed_ms = await run_in_threadpool(analyze, crop, named_files, k, BATCH_SIZE)
+    return {"crop": crop, "results": results, "errors": errors, "elapsed_ms": elapsed_ms}
@@ -0,0 +1,31 @@
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class RemoteInferenceError(Exception):
+    pass
+
+
+def predict_remote(base_url, crop, data, k=10, tta=False, gate=True, timeout=30):
+    # Sends raw image bytes to the inference API and returns (index, probability) pairs, best first;
+    # gate=False skips the API's quality gate for images the caller already checked
+    url = f"{base_url.rstrip('/')}/predict/{urllib.parse.quote(crop)}?k={k}"
+    if tta:
+        url += "&tta=true"
+    if not gate:
+        url += "&gate=false"
+    request = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/octet-stream"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.load(e).get("detail", e.reason)
+        except ValueError:
+            detail = e.reason
+        raise RemoteInferenceError(f"inference service returned {e.code}: {detail}") from e
+    except urllib.error.URLError as e:
+        raise RemoteInferenceError(f"inference service at {base_url} is unreachable: {e.reason}") from e
+    return [(p["index"], p["confidence"] / 100) for p in body["predictions"]]
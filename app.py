@@ -1,16 +1,20 @@
-import os
+# Only light imports here so the login page paints quickly; TensorFlow, pandas,
+# the Firebase SDKs and the models load on first use or in the warm-up thread
+import logging
+import threading
 import streamlit as st
-import tensorflow as tf
-import numpy as np
-import pandas as pd
-from datetime import datetime
-from PIL import Image
-from utils import register_user, authenticate_user, save_scan, get_user_history
-import base64
-
-def get_base64_img(path):
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+from utils import register_user, authenticate_user, resume_session, end_session, issue_resume_ticket, redeem_resume_ticket, save_scan, get_user_history, get_user_summary, has_more_history, pending_sync_count, warm_clients, HISTORY_PAGE_SIZE
+from model_registry import ModelRegistry
+from inference import get_class_names, open_image, preprocess_image, parse_label, iter_uploaded_images, run_batch, top_k
+from prediction_cache import CACHED_TOP_K, PredictionCache, image_key
+from batcher import MicroBatcher
+from api_client import RemoteInferenceError, predict_remote
+from config import INFERENCE_API_URL, METRICS_PORT, USE_WORKER_POOL, QUALITY_GATE_ENABLED, TTA_VIEWS
+import metrics
+from assets import get_css, get_thumbnail_url, preload_assets
+from tta import ensemble_members, predict_tta
+from quality_gate import check_image
+from worker_pool import InferenceWorkerPool
 
 # 1. PAGE CONFIGURATION
 st.set_page_config(
@@ -28,222 +32,85 @@ TEXT_COLOR = "#1e293b"
 
 # ================= CSS STYLING =================
 def load_css():
-    st.markdown(f"""
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-        
-        * {{
-            font-family: 'Inter', sans-serif;
-        }}
-
-        .stApp {{
-            background-color: {BG_COLOR};
-        }}
-        
-        /* Reduce default streamlit top padding */
-        .block-container {{
-            padding-top: 3rem;
-        }}
-
-        /* --- DASHBOARD GALLERY CARDS --- */
-        .selection-card {{
-            background: white;
-            border-radius: 20px;
-            padding: 1.5rem;
-            text-align: center;
-            border: 2px solid #e2e8f0;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.05);
-            cursor: pointer;
-        }}
-        
-        .card-img-wrapper {{
-            border-radius: 12px;
-            overflow: hidden;
-            margin-bottom: 1rem;
-            height: 200px;
-        }}
-        .card-img-wrapper img {{
-            width: 100%;
-            height: 100%;
-            object-fit: cover;
-        }}
-
-        /* --- LOGIN PAGE: SPLIT CARDS --- */
-        [data-testid="column"]:nth-of-type(2) > div {{
-            border-radius: 20px !important;
-            height: 100%;
-            min-height: 550px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.05);
-        }}
-        
-        [data-testid="column"]:nth-of-type(3) > div {{
-            background-color: white !important;
-            border-radius: 20px !important;
-            padding: 3rem !important;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.05);
-            height: 100%;
-            min-height: 550px;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-        }}
-
-        /* --- DASHBOARD STYLES --- */
-        .hero-banner {{
-            position: sticky;
-            top: 3.75rem; 
-            z-index: 999;
-            background: linear-gradient(120deg, #064e3b 0%, #10b981 100%);
-            /* Reduced padding: 1rem top/bottom, 2rem left/right */
-            padding: 1rem 2rem; 
-            border-radius: 16px;
-            color: white;
-            /* Reduced margin to bring content below it closer */
-            margin-bottom: 1.5rem; 
-            box-shadow: 0 10px 25px -5px rgba(16, 185, 129, 0.3);
-            backdrop-filter: blur(10px);
-        }}
-        
-        .css-card {{
-            background: white;
-            padding: 2rem;
-            border-radius: 16px;
-            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.05);
-            margin-bottom: 1rem;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .metric-container {{
-            background-color: #f8fafc;
-            border: 1px solid #e2e8f0;
-            border-radius: 12px;
-            padding: 15px;
-            text-align: center;
-        }}
-        .metric-label {{
-            font-size: 0.85rem;
-            color: #64748b;
-            font-weight: 600;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        .metric-value {{
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: #0f172a;
-        }}
-
-        .stButton > button {{
-            background-color: {PRIMARY_COLOR};
-            color: white;
-            border: none;
-            padding: 0.75rem 1.5rem;
-            border-radius: 10px;
-            font-weight: 600;
-            width: 100%;
-            transition: all 0.2s;
-            box-shadow: 0 4px 6px -1px rgba(16, 185, 129, 0.2);
-        }}
-        .stButton > button:hover {{
-            background-color: #059669;
-            transform: translateY(-2px);
-            box-shadow: 0 10px 15px -3px rgba(16, 185, 129, 0.3);
-
-        }}
-
-        button[kind="secondary"] {{
-            background-color: transparent;
-            color: #1e293b;
-            border: 1px solid #e2e8f0;
-            box-shadow: none;
-        }}
-        button[kind="secondary"]:hover {{
-            border-color: {PRIMARY_COLOR};
-            color: {PRIMARY_COLOR};
-            background-color: #f0fdf4;
-        }}
-        
-        .stTextInput > div > div > input {{
-            border-radius: 10px;
-            padding: 12px;
-            border: 1px solid #e2e8f0;
-        }}
-        .stTextInput > div > div > input:focus {{
-            border-color: {PRIMARY_COLOR};
-            box-shadow: 0 0 0 3px rgba(16, 185, 129, 0.2);
-        }}
-        /* Position the button to overlap the card */
-        .stButton > button[key^="btn_"] {{
-            height: 340px;          /* Keep this the same as your card height */
-            margin-top: 10px;     /* CHANGE THIS: Moving it from -360px to -330px creates a 30px gap */
-            background-color: transparent !important;
-            border: none !important;
-            color: transparent !important;
-            z-index: 10;
-            transition: all 0.3s ease;
-      }}
-
-        /* Add a subtle highlight to the card when the invisible button is hovered */
-        .stButton > button[key^="btn_"]:hover {{
-            background-color: rgba(16, 185, 129, 0.05) !important;
-            cursor: pointer;
-        }}
-        
-        
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(f"<style>{get_css(PRIMARY_COLOR=PRIMARY_COLOR, BG_COLOR=BG_COLOR, TEXT_COLOR=TEXT_COLOR)}</style>", unsafe_allow_html=True)
 
 load_css()
 
 # ================= MODEL LOADER =================
 @st.cache_resource
-def load_models():
-    models = {"Rice": None, "Pulses": None}
+def load_registry():
+    return ModelRegistry()
 
-    model_paths = {
-        "Rice": "models/rice_model1.keras",
-        "Pulses": "models/pulses_model1.keras"
-    }
 
-    for name, path in model_paths.items():
-        if os.path.exists(path):
-            try:
-                models[name] = tf.keras.models.load_model(
-                    path,
-                    compile=False,
-                    safe_mode=False
-                )
+@st.cache_resource
+def load_worker_pool():
+    # Models run in worker processes, so inference never competes with the UI for the GIL
+    return InferenceWorkerPool() if USE_WORKER_POOL else None
 
-                # Force build to avoid Keras graph bugs
-                models[name].build((None, 224, 224, 3))
 
-            except Exception as e:
-                st.error(f"{name} model failed to load: {e}")
+@st.cache_resource
+def load_batcher():
+    # Shared by every session, so concurrent scans of one crop share a forward pass
+    return MicroBatcher(pool.backend if pool else registry.get)
 
-        else:
-            st.warning(f"{name} model file not found at {path}")
 
-    return models
+@st.cache_resource
+def load_prediction_cache():
+    return PredictionCache()
+
+
+@st.cache_resource
+def start_metrics():
+    metrics.register_collector(lambda: metrics.cache_gauges(prediction_cache))
+    metrics.register_collector(lambda: metrics.batcher_gauges(batcher))
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+
+
+@st.cache_resource
+def start_warmup():
+    # Runs once per process, after the first page has been sent: everything a
+    # signed-in session needs, so the first scan does not wait for it either
+    def warm_pandas():
+        import pandas  # noqa: F401
+
+    def warm_models():
+        if INFERENCE_API_URL or pool:
+            return
+        for crop in registry.crops()[:registry.max_resident]:
+            registry.get(crop)
+
+    def warm():
+        for step in (warm_clients, lambda: preload_assets(registry.manifest), warm_pandas, warm_models):
+            try:
+                step()
+            except Exception:
+                # get_model and the Firestore calls report these properly when they are used
+                logging.getLogger(__name__).exception("Warm-up step failed")
 
+    threading.Thread(target=warm, name="warmup", daemon=True).start()
 
-loaded_models = load_models()
 
-# ================= HELPERS =================
-def get_class_names(choice):
-    filename = "static/rice_classes.txt" if choice == "Rice" else "static/pulses_classes.txt"
+registry = load_registry()
+pool = load_worker_pool()
+prediction_cache = load_prediction_cache()
+batcher = load_batcher()
+start_metrics()
+
+def model_version(crop):
+    # Version, backend and quantisation: the cache key and the "model" metrics label
+    return registry.variant(crop)
+
+def get_model(crop):
+    if pool:
+        return pool.backend(crop)
     try:
-        with open(filename, "r") as f:
-            return [line.strip() for line in f.readlines()]
-    except FileNotFoundError:
-        return []
-
-def preprocess_image(image):
-    image = image.convert("RGB")
-    image = image.resize((224, 224))
-    img = np.array(image, dtype=np.float32) / 255.0
-    img = np.expand_dims(img, axis=0)
-    return img
+        return registry.get(crop)
+    except FileNotFoundError as e:
+        st.warning(f"{crop} model file not found at {e.filename}")
+    except Exception as e:
+        st.error(f"{crop} model failed to load: {e}")
+    return None
 
 # ================= SESSION MANAGEMENT =================
 if "logged_in" not in st.session_state:
@@ -255,17 +122,36 @@ if "page" not in st.session_state:
 if "crop_choice" not in st.session_state:
     st.session_state.crop_choice = None
 
-def login_user(username):
+def login_user(username, session_id):
     st.session_state.logged_in = True
     st.session_state.username = username
+    st.session_state.session_id = session_id
     st.session_state.page = "dashboard"
 
 def logout_user():
+    end_session(st.session_state.get("session_id"))
+    st.query_params.pop("resume", None)
     st.session_state.logged_in = False
+    st.session_state.session_id = None
     st.session_state.username = ""
     st.session_state.crop_choice = None
     st.session_state.page = "dashboard"
 
+# Verified from memory on every run; only a token close to expiry costs a refresh call
+if st.session_state.logged_in:
+    if resume_session(st.session_state.get("session_id")) is None:
+        logout_user()
+elif "resume" in st.query_params:
+    session_id = redeem_resume_ticket(st.query_params["resume"])
+    resumed = resume_session(session_id)
+    if resumed: login_user(resumed, session_id)
+    else: st.query_params.pop("resume", None)
+
+# The URL carries a resume ticket, not the session id, so a reload or reconnect can skip
+# signing in; it is single-use, short-lived and replaced on every run, so a copied URL dies fast
+if st.session_state.logged_in:
+    st.query_params["resume"] = issue_resume_ticket(st.session_state.session_id)
+
 # ================= NAVIGATION & SIDEBAR =================
 def render_sidebar():
     with st.sidebar:
@@ -282,6 +168,12 @@ def render_sidebar():
             st.session_state.page = "history"
             st.rerun()
 
+        stats = prediction_cache.stats()
+        st.caption(f"Prediction cache: {stats['hits'] + stats['disk_hits']} hits / {stats['misses']} misses")
+        pending = pending_sync_count()
+        if pending:
+            st.caption(f"{pending} scans saved offline, waiting to sync")
+
         st.markdown("<div style='margin-top: 50px;'></div>", unsafe_allow_html=True)
         if st.button("Log Out", use_container_width=True):
             logout_user()
@@ -313,7 +205,7 @@ def login_page():
             u_pass = st.text_input("Password", type="password", key="login_pass")
             if st.button("Sign In →", use_container_width=True):
                 status, response = authenticate_user(u_email, u_pass)
-                if status: login_user(u_email); st.rerun()
+                if status: login_user(resume_session(response), response); st.rerun()
                 else: st.error(response)
         with tab_register:
             new_user = st.text_input("Email", key="reg_user")
@@ -326,8 +218,6 @@ def login_page():
 # ================= PAGE 2: DASHBOARD VIEW =================
 def dashboard_view():
     if st.session_state.page == "dashboard":
-        rice_base64 = get_base64_img("static/rice_pic.jpg")
-        pulses_base64 = get_base64_img("static/pulses_pic.jpeg")
         # Only show the Dashboard hero banner and Selection Cards if NO crop is selected
         if not st.session_state.crop_choice:
             # The Dashboard Banner
@@ -337,111 +227,222 @@ def dashboard_view():
                         <h6 style='text-align: center;'>Select a crop to analyze its leaf health</h6>
             """, unsafe_allow_html=True)
 
-            col_rice, col_pulses = st.columns(2, gap="large")
-            
+            manifest = registry.manifest
+            columns = st.columns(len(manifest), gap="large")
 
-            with col_rice:
-                st.markdown(f"""
-                    <div class="selection-card">
-                        <div class="card-img-wrapper">
-                            <img src="data:image/jpeg;base64,{rice_base64}">
-                        </div>
-                        <h4 style="margin: 0; color: #1e293b;">Rice Detection</h4>
-                        <p style="color: #64748b; font-size: 0.9rem;">Analyze paddy leaf diseases</p>
-                    </div>
-                """, unsafe_allow_html=True)
-                if st.button("Analyze Rice crops", key="btn_rice", use_container_width=True):
-                    st.session_state.crop_choice = "Rice"
-                    st.rerun()
-
-            with col_pulses:
-                st.markdown(f"""
-                    <div class="selection-card">
-                        <div class="card-img-wrapper">
-                            <img src="data:image/jpeg;base64,{pulses_base64}">
+            for col, (crop, entry) in zip(columns, manifest.items()):
+                with col:
+                    st.markdown(f"""
+                        <div class="selection-card">
+                            <div class="card-img-wrapper">
+                                <img src="{get_thumbnail_url(entry["image"])}">
+                            </div>
+                            <h4 style="margin: 0; color: #1e293b;">{crop} Detection</h4>
+                            <p style="color: #64748b; font-size: 0.9rem;">{entry.get("description", "")}</p>
                         </div>
-                        <h4 style="margin: 0; color: #1e293b;">Pulses Detection</h4>
-                        <p style="color: #64748b; font-size: 0.9rem;">Analyze bean and pea diseases</p>
-                    </div>
-                """, unsafe_allow_html=True)
-                if st.button("Analyze Pulses crops", key="btn_pulses", use_container_width=True):
-                    st.session_state.crop_choice = "Pulses"
-                    st.rerun()
+                    """, unsafe_allow_html=True)
+                    if st.button(f"Analyze {crop} crops", key=f"btn_{crop.lower()}", use_container_width=True):
+                        st.session_state.crop_choice = crop
+                        st.rerun()
         # This part triggers ONLY after a crop is selected
         else:
             if st.button("← Back to Crop Selection", type="secondary"):
                 st.session_state.crop_choice = None
                 st.rerun()
 
-            col1, col2 = st.columns([1, 1.4], gap="medium")
-            current_model = loaded_models.get(st.session_state.crop_choice)
+            # With an inference API configured the single-leaf path never loads a model here
+            current_model = None if INFERENCE_API_URL else get_model(st.session_state.crop_choice)
             class_names = get_class_names(st.session_state.crop_choice)
+            mode = st.radio("Mode", ["Single Leaf", "Batch"], horizontal=True, label_visibility="collapsed")
+
+            if mode == "Batch":
+                batch_view(current_model, class_names)
+                return
+
+            col1, col2 = st.columns([1, 1.4], gap="medium")
+            stage_labels = {"crop": st.session_state.crop_choice, "model": model_version(st.session_state.crop_choice)}
 
             with col1:
                 st.markdown(f"<h3>Upload {st.session_state.crop_choice} Leaf</h3>", unsafe_allow_html=True)
                 uploaded_file = st.file_uploader("", type=["jpg", "png", "jpeg"], label_visibility="collapsed")
                 if uploaded_file:
-                    image = Image.open(uploaded_file)
+                    with metrics.span("decode", **stage_labels):
+                        image = open_image(uploaded_file)
+                        image.load()
                     st.image(image, use_container_width=True, caption="Source Image")
+                    if QUALITY_GATE_ENABLED:
+                        # Once per upload, not on every rerun, so the rejection counters stay honest
+                        cached = st.session_state.get("quality_report")
+                        if cached and cached[0] == uploaded_file.file_id:
+                            quality = cached[1]
+                        else:
+                            with metrics.span("quality_gate", **stage_labels):
+                                quality = check_image(image)
+                            st.session_state.quality_report = (uploaded_file.file_id, quality)
+                        if not quality["ok"]:
+                            st.warning(f"This photo can't be analyzed reliably ({', '.join(quality['reasons'])}). Retake it in good light, close to a single leaf, holding the camera steady.")
+                            # The checks can misjudge real photos, e.g. heavily browned leaves fall outside the green mask
+                            override = st.checkbox("Analyze anyway", key=f"quality_override_{uploaded_file.file_id}")
 
             with col2:
                 st.markdown("<h3>Analysis Results</h3>", unsafe_allow_html=True)
-                if uploaded_file and st.button("Analyze Leaf", use_container_width=True):
-                    if current_model:
+                high_accuracy = st.toggle("High-accuracy mode", help="Averages several flipped and zoomed views (and any extra model checkpoints); slower")
+                rejected = uploaded_file and QUALITY_GATE_ENABLED and not quality["ok"] and not override
+                if uploaded_file and not rejected and st.button("Analyze Leaf", use_container_width=True):
+                    if QUALITY_GATE_ENABLED and not quality["ok"]:
+                        metrics.inc("quality_overrides_total")
+                    if INFERENCE_API_URL or current_model:
                         with st.spinner(f"Analyzing {st.session_state.crop_choice} leaf using AI model..."):
-                            img = preprocess_image(image)
-                            preds = current_model.predict(img)
-                            top_indices = np.argsort(preds[0])[-10:][::-1]
-                            idx = top_indices[0]
-                            accuracy = preds[0][idx] * 100
-                            label = class_names[idx] if idx < len(class_names) else "Unknown"
-
-                            if "___" in label:
-                                plant, disease = label.split("___")
-                            else:
-                                plant, disease = st.session_state.crop_choice, label
+                            with metrics.span("cache_lookup", **stage_labels):
+                                crop = st.session_state.crop_choice
+                                members = 1 if pool else registry.ensemble_size(crop)
+                                version = registry.tta_variant(crop, TTA_VIEWS, members) if high_accuracy else model_version(crop)
+                                key = image_key(crop, version, image)
+                                top = prediction_cache.get(key)
+                            if top is None:
+                                try:
+                                    top = predict_leaf(st.session_state.crop_choice, image, uploaded_file, current_model, high_accuracy, stage_labels)
+                                except RemoteInferenceError as e:
+                                    st.error(f"Could not analyze the leaf: {e}")
+                                except TimeoutError:
+                                    st.error(f"{st.session_state.crop_choice} analysis timed out, please try again.")
+                                except Exception as e:
+                                    st.error(f"{st.session_state.crop_choice} analysis failed: {e}")
+                                else:
+                                    prediction_cache.put(key, top)
+                            if top is not None:
+                                idx = top[0][0]
+                                accuracy = top[0][1] * 100
+                                label = class_names[idx] if idx < len(class_names) else "Unknown"
+                                plant, disease = parse_label(label, st.session_state.crop_choice)
                         
-                            is_healthy = "healthy" in disease.lower()
-                            color = PRIMARY_COLOR if is_healthy else "#ef4444"
-                            save_scan(st.session_state.username, plant, disease.replace('_', ' '), float(accuracy), "Healthy" if is_healthy else "Infected")
-
-                            st.markdown(f"""
-                            <div style="background: {color}15; border: 1px solid {color}40; border-radius: 12px; padding: 1.5rem; display: flex; align-items: center; justify-content: space-between; margin-bottom: 20px;">
-                                <div>
-                                    <div style="color: {color}; font-size: 0.9rem; font-weight: 600; text-transform: uppercase;">Condition</div>
-                                    <div style="color: {color}; font-size: 1.8rem; font-weight: 700;">{disease.replace('_', ' ')}</div>
-                                    <div style="color: #64748b; font-size: 0.9rem;">Crop: <b>{plant}</b></div>
-                                </div>
-                                <div style="font-size: 3rem;">{'✅' if is_healthy else '⚠️'}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            st.metric("Model Confidence", f"{accuracy:.2f}%")
-                            st.progress(int(accuracy) / 100)
-
-                            df_top = pd.DataFrame({
-                                "Condition": [class_names[i] if i < len(class_names) else f"Idx {i}" for i in top_indices],
-                                "Confidence": [preds[0][i] * 100 for i in top_indices]
-                            })
-                            st.dataframe(df_top, column_config={"Confidence": st.column_config.ProgressColumn("Probability", format="%.2f%%", min_value=0, max_value=100)}, use_container_width=True, hide_index=True)
+                                is_healthy = "healthy" in disease.lower()
+                                with metrics.span("save_scan", **stage_labels):
+                                    save_scan(st.session_state.username, plant, disease.replace('_', ' '), float(accuracy), "Healthy" if is_healthy else "Infected")
+
+                                with metrics.span("render", **stage_labels):
+                                    render_diagnosis(plant, disease, is_healthy, accuracy, top, class_names)
                     else: st.error(f"{st.session_state.crop_choice} model not loaded.")
                 elif not uploaded_file: st.info("Please upload an image to begin.")
 
+def predict_leaf(crop, image, uploaded_file, current_model, high_accuracy, stage_labels):
+    # Top-k (index, probability) pairs from the inference API, TTA, or the micro-batcher
+    if INFERENCE_API_URL:
+        with metrics.span("remote_predict", **stage_labels):
+            return predict_remote(INFERENCE_API_URL, crop, uploaded_file.getvalue(), k=CACHED_TOP_K, tta=high_accuracy, gate=False)
+    if high_accuracy:
+        with metrics.span("predict_tta", **stage_labels):
+            members = [current_model] if pool else ensemble_members(registry, crop)
+            probs = predict_tta(members, image)
+        return [(i, probs[i]) for i in top_k(probs)]
+    with metrics.span("preprocess", **stage_labels):
+        img = preprocess_image(image)
+    with metrics.span("predict", **stage_labels):
+        probs = batcher.predict(crop, img[0])
+    with metrics.span("postprocess", **stage_labels):
+        return [(i, probs[i]) for i in top_k(probs)]
+
+def render_diagnosis(plant, disease, is_healthy, accuracy, top, class_names):
+    color = PRIMARY_COLOR if is_healthy else "#ef4444"
+    st.markdown(f"""
+    <div style="background: {color}15; border: 1px solid {color}40; border-radius: 12px; padding: 1.5rem; display: flex; align-items: center; justify-content: space-between; margin-bottom: 20px;">
+        <div>
+            <div style="color: {color}; font-size: 0.9rem; font-weight: 600; text-transform: uppercase;">Condition</div>
+            <div style="color: {color}; font-size: 1.8rem; font-weight: 700;">{disease.replace('_', ' ')}</div>
+            <div style="color: #64748b; font-size: 0.9rem;">Crop: <b>{plant}</b></div>
+        </div>
+        <div style="font-size: 3rem;">{'✅' if is_healthy else '⚠️'}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    import pandas as pd
+
+    st.metric("Model Confidence", f"{accuracy:.2f}%")
+    st.progress(int(accuracy) / 100)
+
+    df_top = pd.DataFrame({
+        "Condition": [class_names[i] if i < len(class_names) else f"Idx {i}" for i, _ in top],
+        "Confidence": [p * 100 for _, p in top]
+    })
+    st.dataframe(df_top, column_config={"Confidence": st.column_config.ProgressColumn("Probability", format="%.2f%%", min_value=0, max_value=100)}, use_container_width=True, hide_index=True)
+
+def batch_view(current_model, class_names):
+    import pandas as pd
+
+    crop = st.session_state.crop_choice
+    st.markdown(f"<h3>Upload {crop} Leaves</h3>", unsafe_allow_html=True)
+    uploaded_files = st.file_uploader("", type=["jpg", "png", "jpeg", "zip"], accept_multiple_files=True, label_visibility="collapsed", key="batch_upload")
+
+    if not uploaded_files:
+        st.info("Upload several leaf images or a zip archive to begin.")
+        return
+
+    if st.button("Analyze Batch", use_container_width=True):
+        if current_model is None:
+            current_model = get_model(crop)
+        if not current_model:
+            st.error(f"{crop} model not loaded.")
+            return
+
+        try:
+            with st.spinner(f"Analyzing {crop} leaves using AI model..."):
+                results, failed, images_per_sec = run_batch(current_model, iter_uploaded_images(uploaded_files), crop, class_names, cache=prediction_cache, version=model_version(crop))
+        except TimeoutError:
+            st.error(f"{crop} batch analysis timed out, please try again.")
+            return
+        except Exception as e:
+            st.error(f"{crop} batch analysis failed: {e}")
+            return
+
+        for r in results:
+            save_scan(st.session_state.username, r["plant"], r["disease"], r["confidence"], r["status"])
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Images", len(results))
+        m2.metric("Healthy", sum(r["status"] == "Healthy" for r in results))
+        m3.metric("Infected", sum(r["status"] == "Infected" for r in results), delta_color="inverse")
+        m4.metric("Throughput", f"{images_per_sec:.1f} img/s")
+
+        df = pd.DataFrame(results).rename(columns={"file": "File", "plant": "Crop", "disease": "Diagnosis", "confidence": "Confidence", "status": "Status"})
+        st.dataframe(df, column_config={"Confidence": st.column_config.ProgressColumn("Confidence", format="%.2f%%", min_value=0, max_value=100)}, use_container_width=True, hide_index=True)
+
+        for name, error in failed:
+            st.warning(f"Skipped {name}: {error}")
+
 # ================= PAGE 3: HISTORY VIEW =================
 def history_page():
+    import pandas as pd
+
     if st.session_state.page == "history":
         st.markdown("<h2 style='text-align: center;'>Scan History</h2>", unsafe_allow_html=True)
-        history_data = get_user_history(st.session_state.username)
-        if not history_data:
+        summary = get_user_summary(st.session_state.username)
+        if not summary.get("total"):
             st.info("No scans found.")
         else:
-            df = pd.DataFrame(history_data)
+            status = summary.get("status", {})
             m1, m2, m3 = st.columns(3)
-            m1.metric("Total Scans", len(df))
-            m2.metric("Healthy", len(df[df['status'] == 'Healthy']))
-            m3.metric("Infected", len(df[df['status'] == 'Infected']), delta_color="inverse")
+            m1.metric("Total Scans", summary["total"])
+            m2.metric("Healthy", status.get("Healthy", 0))
+            m3.metric("Infected", status.get("Infected", 0), delta_color="inverse")
+
+            c1, c2 = st.columns([2, 1], gap="medium")
+            with c1:
+                st.markdown("<h4>Scans per Day</h4>", unsafe_allow_html=True)
+                by_day = pd.DataFrame.from_dict(summary.get("by_day", {}), orient="index").fillna(0).sort_index()
+                st.bar_chart(by_day[[c for c in ("Healthy", "Infected") if c in by_day.columns]].tail(30))
+            with c2:
+                st.markdown("<h4>Scans per Crop</h4>", unsafe_allow_html=True)
+                st.bar_chart(pd.Series(summary.get("by_crop", {}), name="Scans"))
+
+            limit = st.session_state.get("history_limit", HISTORY_PAGE_SIZE)
+            history_data = get_user_history(st.session_state.username, limit)
+            df = pd.DataFrame(history_data)
             df = df.rename(columns={"date": "Date", "plant": "Crop", "disease": "Diagnosis", "confidence": "Confidence", "status": "Status"})
             st.dataframe(df, use_container_width=True, hide_index=True)
+            if has_more_history(st.session_state.username, len(history_data)):
+                if st.button("Load older scans", type="secondary"):
+                    st.session_state.history_limit = limit + HISTORY_PAGE_SIZE
+                    st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
 # ================= APP CONTROLLER =================
@@ -452,3 +453,5 @@ if st.session_state.logged_in:
 else:
     login_page()
 
+start_warmup()
+
@@ -0,0 +1,64 @@
+import os
+from functools import lru_cache
+from string import Template
+
+from PIL import Image
+
+CSS_PATH = "static/style.css"
+THUMBNAIL_SIZE = (640, 640)
+
+# Streamlit serves ./static at app/static when server.enableStaticServing is on
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+THUMBNAIL_DIR = "thumbnails"
+
+
+# ---------- CLASS NAMES ----------
+
+@lru_cache(maxsize=None)
+def load_class_names(path):
+    try:
+        with open(path, "r") as f:
+            return tuple(line.strip() for line in f if line.strip())
+    except FileNotFoundError:
+        return ()
+
+
+def validate_class_names(crop, path, num_outputs):
+    class_names = load_class_names(path)
+    if len(class_names) != num_outputs:
+        raise ValueError(f"{crop} model has {num_outputs} outputs but {path} lists {len(class_names)} classes")
+    return class_names
+
+
+# ---------- IMAGES / CSS ----------
+
+@lru_cache(maxsize=None)
+def get_thumbnail_url(path, size=THUMBNAIL_SIZE):
+    # The dashboard cards are ~200px tall, so there is no point shipping a multi-MB original.
+    # The thumbnail is written once under static/ and referenced by URL, so the browser
+    # fetches and caches it instead of receiving it inline on every rerun.
+    name = os.path.splitext(os.path.basename(path))[0] + ".jpg"
+    out = os.path.join(STATIC_DIR, THUMBNAIL_DIR, name)
+    if not os.path.exists(out) or os.path.getmtime(out) < os.path.getmtime(path):
+        image = Image.open(path)
+        image.draft("RGB", size)
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        image.save(out + ".tmp", format="JPEG", quality=85, optimize=True)
+        os.replace(out + ".tmp", out)
+    # The mtime busts the browser cache when the source picture changes
+    return f"{STATIC_URL}/{THUMBNAIL_DIR}/{name}?v={int(os.path.getmtime(out))}"
+
+
+@lru_cache(maxsize=None)
+def get_css(**theme):
+    with open(CSS_PATH, "r") as f:
+        return Template(f.read()).substitute(theme)
+
+
+def preload_assets(manifest):
+    for entry in manifest.values():
+        load_class_names(entry["classes"])
+        get_thumbnail_url(entry["image"])
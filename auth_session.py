@@ -0,0 +1,186 @@
+import json
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import metrics
+from config import AUTH_REFRESH_MARGIN, AUTH_RESUME_TICKET_TTL, AUTH_SESSION_IDLE_TIMEOUT
+
+
+# ---------- TOKEN VERIFICATION ----------
+
+def verify_with_admin(id_token):
+    # Checks the signature locally against Google's public keys; firebase_admin
+    # caches the keys for as long as their Cache-Control allows, so this is
+    # normally no network call. Honours FIREBASE_AUTH_EMULATOR_HOST.
+    from firebase_admin import auth as admin_auth
+
+    return admin_auth.verify_id_token(id_token)
+
+
+# ---------- AUTH REST CLIENT ----------
+
+class RestAuthClient:
+    # The three pyrebase auth calls the app uses, against the Identity Toolkit
+    # REST API or, with emulator_host, the local Firebase Auth emulator
+
+    def __init__(self, api_key, emulator_host=None, timeout=10):
+        self.api_key = api_key
+        self.timeout = timeout
+        prefix = f"http://{emulator_host}/" if emulator_host else "https://"
+        self._accounts_url = prefix + "identitytoolkit.googleapis.com/v1/accounts:{}?key=" + api_key
+        self._token_url = prefix + "securetoken.googleapis.com/v1/token?key=" + api_key
+
+    def _post(self, url, payload):
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            raise ValueError(e.read().decode(errors="replace")) from None
+
+    def sign_in_with_email_and_password(self, email, password):
+        return self._post(self._accounts_url.format("signInWithPassword"),
+                          {"email": email, "password": password, "returnSecureToken": True})
+
+    def create_user_with_email_and_password(self, email, password):
+        return self._post(self._accounts_url.format("signUp"),
+                          {"email": email, "password": password, "returnSecureToken": True})
+
+    def refresh(self, refresh_token):
+        body = self._post(self._token_url, {"grant_type": "refresh_token", "refresh_token": refresh_token})
+        # Same shape as pyrebase's refresh()
+        return {"userId": body["user_id"], "idToken": body["id_token"], "refreshToken": body["refresh_token"]}
+
+
+# ---------- SESSIONS ----------
+
+class _Session:
+
+    def __init__(self, id_token, refresh_token, claims, now):
+        self.id_token = id_token
+        self.refresh_token = refresh_token
+        self.claims = claims
+        self.last_seen = now
+        self.ticket = None
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    # Maps opaque session ids to a signed-in user's tokens. Claims are verified
+    # once per ID token; lookups after that touch nothing but memory until the
+    # token is within refresh_margin seconds of expiring. Session ids stay server-side
+    # state; anything that has to travel in a URL gets a resume ticket instead.
+
+    def __init__(self, auth_client, verify=verify_with_admin, refresh_margin=AUTH_REFRESH_MARGIN,
+                 idle_timeout=AUTH_SESSION_IDLE_TIMEOUT, ticket_ttl=AUTH_RESUME_TICKET_TTL, clock=time.time):
+        self.auth_client = auth_client
+        self.verify = verify
+        self.refresh_margin = refresh_margin
+        self.idle_timeout = idle_timeout
+        self.ticket_ttl = ticket_ttl
+        self.clock = clock
+        self._sessions = {}
+        self._tickets = {}
+        self._lock = threading.Lock()
+
+    def sign_in(self, email, password):
+        user = self.auth_client.sign_in_with_email_and_password(email, password)
+        return self.create(user["idToken"], user["refreshToken"])
+
+    def create(self, id_token, refresh_token):
+        claims = self.verify(id_token)
+        session_id = secrets.token_urlsafe(32)
+        with self._lock:
+            self._expire_idle()
+            self._sessions[session_id] = _Session(id_token, refresh_token, claims, self.clock())
+        return session_id
+
+    def resolve(self, session_id):
+        # Verified claims for the session, or None if it is unknown or can no longer be refreshed
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            return None
+
+        with session.lock:
+            now = self.clock()
+            # Idle sessions end even if their refresh token would still work
+            if now - session.last_seen > self.idle_timeout:
+                self.revoke(session_id)
+                return None
+            if session.claims["exp"] - now < self.refresh_margin:
+                try:
+                    tokens = self.auth_client.refresh(session.refresh_token)
+                    session.claims = self.verify(tokens["idToken"])
+                except Exception:
+                    metrics.inc("auth_refresh_failures_total")
+                    # A token that has not expired yet still counts; retry on the next lookup
+                    if session.claims["exp"] > now:
+                        session.last_seen = now
+                        return session.claims
+                    self.revoke(session_id)
+                    return None
+                else:
+                    session.id_token = tokens["idToken"]
+                    session.refresh_token = tokens["refreshToken"]
+                    metrics.inc("auth_refreshes_total")
+            session.last_seen = now
+            return session.claims
+
+    def id_token(self, session_id):
+        # Current ID token, refreshed if needed, for calls that must act as the user
+        if self.resolve(session_id) is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+        return session.id_token if session else None
+
+    def issue_ticket(self, session_id):
+        # Single-use stand-in for the session id that expires after ticket_ttl seconds;
+        # issuing a new one invalidates the session's previous ticket
+        ticket = secrets.token_urlsafe(16)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            self._tickets.pop(session.ticket, None)
+            session.ticket = ticket
+            self._tickets[ticket] = (session_id, self.clock() + self.ticket_ttl)
+        return ticket
+
+    def redeem_ticket(self, ticket):
+        # The session id a ticket stands for, or None; a ticket works at most once
+        with self._lock:
+            session_id, expires = self._tickets.pop(ticket, (None, 0))
+            session = self._sessions.get(session_id)
+            if session is not None and session.ticket == ticket:
+                session.ticket = None
+        return session_id if self.clock() < expires else None
+
+    def revoke(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._tickets.pop(session.ticket, None)
+
+    def active_emails(self):
+        # Users with at least one live session; idle sessions are dropped first
+        with self._lock:
+            self._expire_idle()
+            return {s.claims.get("email") for s in self._sessions.values()} - {None}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _expire_idle(self):
+        cutoff = self.clock() - self.idle_timeout
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_seen < cutoff]:
+            self._tickets.pop(self._sessions.pop(session_id).ticket, None)
+        now = self.clock()
+        for ticket in [t for t, (_, expires) in self._tickets.items() if expires <= now]:
+            del self._tickets[ticket]
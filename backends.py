@@ -0,0 +1,224 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from config import IMG_SIZE
+
+# TensorFlow is imported by the backends that need it, so serving an already
+# converted .tflite model never loads it (see tflite_interpreter)
+
+
+def input_spec():
+    import tensorflow as tf
+
+    return tf.TensorSpec((None, IMG_SIZE, IMG_SIZE, 3), tf.float32, name="inputs")
+
+
+def tflite_interpreter(path, num_threads):
+    # The standalone LiteRT runtime when installed (a few MB, no TensorFlow), else tf.lite
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path, num_threads=num_threads)
+
+
+def available_cpus():
+    # os.cpu_count() reports the host, not what a container or taskset allows
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# ---------- BACKENDS ----------
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict(batch, verbose=0))
+
+
+class TFFunctionBackend:
+    name = "tf_function"
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self._tf = tf
+        self._fn = tf.function(lambda x: model(x, training=False), input_signature=[input_spec()])
+
+    def predict(self, batch):
+        return self._fn(self._tf.convert_to_tensor(batch, dtype=self._tf.float32)).numpy()
+
+
+class SavedModelBackend:
+    name = "savedmodel"
+
+    def __init__(self, model, export_dir):
+        import tensorflow as tf
+
+        if not os.path.exists(export_dir):
+            export_savedmodel(model, export_dir)
+        self._tf = tf
+        self._loaded = tf.saved_model.load(export_dir)
+        self._fn = self._loaded.signatures["serving_default"]
+
+    def predict(self, batch):
+        outputs = self._fn(inputs=self._tf.convert_to_tensor(batch, dtype=self._tf.float32))
+        return next(iter(outputs.values())).numpy()
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, model, tflite_path, quantization="float16", representative_data=None):
+        if not os.path.exists(tflite_path):
+            convert_to_tflite(model, tflite_path, quantization, representative_data)
+        # XNNPACK is applied by default to float and int8 graphs on CPU
+        self.interpreter = tflite_interpreter(tflite_path, available_cpus())
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        # One interpreter per model, shared by the batcher, session and API threads;
+        # resize/set/invoke/get must not interleave
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input["index"], (batch_size, IMG_SIZE, IMG_SIZE, 3))
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        # dtype and quantization parameters do not change when the batch is resized
+        dtype = self._input["dtype"]
+        if dtype in (np.int8, np.uint8):
+            scale, zero_point = self._input["quantization"]
+            info = np.iinfo(dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+        with self._lock:
+            self._resize(len(batch))
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            preds = self.interpreter.get_tensor(self._output["index"])
+            output = self._output
+
+        if output["dtype"] in (np.int8, np.uint8):
+            scale, zero_point = output["quantization"]
+            preds = (preds.astype(np.float32) - zero_point) * scale
+        return preds
+
+
+# ---------- EXPORT / CONVERSION ----------
+
+def serving_function(model):
+    import tensorflow as tf
+
+    return tf.function(lambda inputs: model(inputs, training=False), input_signature=[input_spec()])
+
+
+def export_savedmodel(model, export_dir):
+    import tensorflow as tf
+
+    fn = serving_function(model)
+    tf.saved_model.save(model, export_dir, signatures=fn.get_concrete_function())
+
+
+def convert_to_tflite(model, tflite_path, quantization="float16", representative_data=None):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantization == "int8":
+        if representative_data is None:
+            raise ValueError("int8 quantization needs representative_data")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[None].astype(np.float32)] for sample in representative_data)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif quantization != "float32":
+        raise ValueError(f"Unknown quantization: {quantization}")
+
+    with open(tflite_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def artifact_path(model_path, suffix):
+    return os.path.splitext(model_path)[0] + suffix
+
+
+def make_backend(model, kind, model_path, quantization="float16", representative_data=None):
+    if kind == "keras":
+        return KerasBackend(model)
+    if kind == "tf_function":
+        return TFFunctionBackend(model)
+    if kind == "savedmodel":
+        return SavedModelBackend(model, artifact_path(model_path, "_savedmodel"))
+    if kind == "tflite":
+        return TFLiteBackend(model, artifact_path(model_path, f"_{quantization}.tflite"), quantization, representative_data)
+    raise ValueError(f"Unknown inference backend: {kind}")
+
+
+# ---------- PARITY / LATENCY ----------
+
+def compare_backends(model, model_path, kinds=("keras", "tf_function", "savedmodel", "tflite"), batch_size=1, runs=20, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = rng.random((batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    reference = np.asarray(model.predict(batch, verbose=0))
+
+    report = []
+    for kind in kinds:
+        backend = make_backend(model, kind, model_path, representative_data=batch)
+        preds = backend.predict(batch)  # warm-up, also traces/allocates
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            backend.predict(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        report.append({
+            "backend": kind,
+            "max_abs_diff": float(np.max(np.abs(preds - reference))),
+            "top1_agreement": float(np.mean(np.argmax(preds, axis=1) == np.argmax(reference, axis=1))),
+            "p50_ms": float(np.percentile(timings, 50)),
+            "p90_ms": float(np.percentile(timings, 90)),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    # python backends.py models/rice_model1.keras [batch_size]
+    import tensorflow as tf
+
+    path = sys.argv[1]
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    keras_model = tf.keras.models.load_model(path, compile=False, safe_mode=False)
+    keras_model.build((None, IMG_SIZE, IMG_SIZE, 3))
+
+    print(f"{'backend':<12} {'max_abs_diff':>12} {'top1_agree':>10} {'p50_ms':>8} {'p90_ms':>8}")
+    for row in compare_backends(keras_model, path, batch_size=size):
+        print(f"{row['backend']:<12} {row['max_abs_diff']:>12.2e} {row['top1_agreement']:>10.3f} {row['p50_ms']:>8.2f} {row['p90_ms']:>8.2f}")
@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+from config import IMG_SIZE, BATCHER_MAX_BATCH_SIZE, BATCHER_MAX_WAIT_MS, BATCHER_TIMEOUT_S
+
+
+def padded_size(n, max_batch_size):
+    # Round up to a power of two so backends only ever see a handful of batch shapes
+    size = 1
+    while size < n:
+        size *= 2
+    return min(size, max_batch_size)
+
+
+class MicroBatcher:
+    # Collects single-image requests per crop and runs them as one forward pass.
+    # The first request in a batch waits at most max_wait_ms for others to join.
+
+    def __init__(self, get_backend, max_batch_size=BATCHER_MAX_BATCH_SIZE, max_wait_ms=BATCHER_MAX_WAIT_MS):
+        self.get_backend = get_backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._max_depth = Counter()
+        self._requests = Counter()
+
+    def submit(self, crop, tensor):
+        # tensor is one preprocessed (224, 224, 3) float32 image
+        future = Future()
+        self._queue(crop).put((tensor, future))
+        with self._lock:
+            self._requests[crop] += 1
+            self._max_depth[crop] = max(self._max_depth[crop], self._queues[crop].qsize())
+        return future
+
+    def predict(self, crop, tensor, timeout=BATCHER_TIMEOUT_S):
+        # Raises TimeoutError rather than blocking the caller forever
+        return self.submit(crop, tensor).result(timeout)
+
+    def _queue(self, crop):
+        with self._lock:
+            if crop not in self._queues:
+                self._queues[crop] = queue.Queue()
+                threading.Thread(target=self._run, args=(crop,), name=f"batcher-{crop}", daemon=True).start()
+            return self._queues[crop]
+
+    def _run(self, crop):
+        q = self._queues[crop]
+        buffer = np.zeros((self.max_batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+        while True:
+            items = [q.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Whatever goes wrong (a malformed tensor, a failed model load or predict)
+            # fails this batch's futures, never the thread that serves the crop
+            try:
+                n = len(items)
+                size = padded_size(n, self.max_batch_size)
+                for i, (tensor, _) in enumerate(items):
+                    buffer[i] = tensor
+                buffer[n:size] = 0.0
+
+                with self._lock:
+                    self._batch_sizes[n] += 1
+
+                preds = np.asarray(self.get_backend(crop).predict(buffer[:size]))
+                results = [preds[i].copy() for i in range(n)]
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for result, (_, future) in zip(results, items):
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": {crop: q.qsize() for crop, q in self._queues.items()},
+                "max_queue_depth": dict(self._max_depth),
+                "requests": dict(self._requests),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
@@ -0,0 +1,146 @@
+"""Headless end-to-end benchmark of the LeafSense inference path.
+
+Times cold model load, warm single-image latency, batch throughput,
+preprocessing cost and peak RSS against small synthetic stand-in models,
+and writes JSON that can be diffed across commits.
+
+Run from the repo root:
+    python -m benchmarks.bench_inference --output bench.json
+    python -m benchmarks.bench_inference --compare bench.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from config import IMG_SIZE, INFERENCE_BACKEND
+
+BATCH_SIZES = (1, 8, 32)
+RESOLUTIONS = ((640, 480), (1600, 1200), (4000, 3000))
+
+
+def percentiles(timings):
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(np.mean(timings)),
+    }
+
+
+def time_calls(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if platform.system() == "Darwin" else rss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_preprocess(runs):
+    from benchmarks.bench_preprocess import synthetic_jpeg
+    from inference import open_image, preprocess_image
+
+    results = {}
+    for width, height in RESOLUTIONS:
+        data = synthetic_jpeg(width, height)
+        results[f"{width}x{height}"] = percentiles(time_calls(lambda: preprocess_image(open_image(io.BytesIO(data))), runs))
+    return results
+
+
+def run(backend, crop, runs, model_dir):
+    import tensorflow as tf
+
+    from backends import available_cpus
+    from benchmarks.synthetic_models import write_synthetic_models
+    from model_registry import ModelRegistry
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": backend,
+        "crop": crop,
+        "tensorflow": tf.__version__,
+        "cpu_count": available_cpus(),
+    }
+
+    manifest_path = write_synthetic_models(model_dir)
+    registry = ModelRegistry(manifest_path, backend=backend)
+
+    start = time.perf_counter()
+    model = registry.get(crop)
+    report["cold_load_ms"] = (time.perf_counter() - start) * 1000
+
+    rng = np.random.default_rng(0)
+    single = rng.random((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    model.predict(single)
+    report["single_image"] = percentiles(time_calls(lambda: model.predict(single), runs))
+
+    report["batch_throughput"] = {}
+    for size in BATCH_SIZES:
+        batch = rng.random((size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+        model.predict(batch)
+        timings = time_calls(lambda: model.predict(batch), max(3, runs // 4))
+        report["batch_throughput"][str(size)] = dict(percentiles(timings), images_per_sec=size / (np.median(timings) / 1000))
+
+    report["preprocess"] = bench_preprocess(runs)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def compare(old, new):
+    # Prints new vs old for every timing both reports share; positive % means slower
+    def flatten(d, prefix=""):
+        for key, value in d.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{prefix}{key}", value
+
+    old_values = dict(flatten(old))
+    print(f"comparing {new.get('commit')} against {old.get('commit')}")
+    for key, value in flatten(new):
+        if key in old_values and old_values[key] and key != "cpu_count":
+            change = (value - old_values[key]) / old_values[key] * 100
+            print(f"{key:<45} {old_values[key]:>12.2f} {value:>12.2f} {change:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=INFERENCE_BACKEND)
+    parser.add_argument("--crop", default="Rice")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--model-dir", default=os.path.join(tempfile.gettempdir(), "leafsense_bench_models"))
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    result = run(args.backend, args.crop, args.runs, args.model_dir)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), result)
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,78 @@
+"""Compare the legacy preprocess_image against the draft-mode pipeline.
+
+Run from the repo root: python -m benchmarks.bench_preprocess
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from config import IMG_SIZE
+from inference import open_image, preprocess_image
+
+RESOLUTIONS = [(1024, 768), (2048, 1536), (4000, 3000)]
+
+
+def legacy_preprocess_image(image):
+    image = image.convert("RGB")
+    image = image.resize((IMG_SIZE, IMG_SIZE))
+    img = np.array(image, dtype=np.float32) / 255.0
+    img = np.expand_dims(img, axis=0)
+    return img
+
+
+def synthetic_jpeg(width, height, seed=0):
+    # Smooth leaf-like gradients plus noise, so JPEG has real detail to decode
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    r = 60 + 40 * np.sin(x / 97.0)
+    g = 140 + 60 * np.cos(y / 131.0) * np.sin(x / 53.0)
+    b = 50 + 30 * np.sin((x + y) / 211.0)
+    pixels = np.stack([r, g, b], axis=-1) + rng.normal(0, 12, (height, width, 3))
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def time_it(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run(runs=5, tolerance=0.02):
+    rows = []
+    for width, height in RESOLUTIONS:
+        data = synthetic_jpeg(width, height)
+
+        legacy = lambda: legacy_preprocess_image(Image.open(io.BytesIO(data)))
+        fast = lambda: preprocess_image(open_image(io.BytesIO(data)))
+
+        diff = np.abs(legacy() - fast())
+        rows.append({
+            "resolution": f"{width}x{height}",
+            "legacy_ms": time_it(legacy, runs),
+            "fast_ms": time_it(fast, runs),
+            "mean_abs_diff": float(diff.mean()),
+            "max_abs_diff": float(diff.max()),
+            "within_tolerance": bool(diff.mean() <= tolerance),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="max allowed mean abs difference")
+    args = parser.parse_args()
+
+    print(f"{'resolution':<12} {'legacy_ms':>10} {'fast_ms':>9} {'speedup':>8} {'mean_diff':>10} {'max_diff':>9}  ok")
+    for row in run(args.runs, args.tolerance):
+        print(f"{row['resolution']:<12} {row['legacy_ms']:>10.1f} {row['fast_ms']:>9.1f} "
+              f"{row['legacy_ms'] / row['fast_ms']:>7.1f}x {row['mean_abs_diff']:>10.4f} {row['max_abs_diff']:>9.4f}  "
+              f"{'yes' if row['within_tolerance'] else 'NO'}")
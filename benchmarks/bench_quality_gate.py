@@ -0,0 +1,156 @@
+"""Accuracy and cost of the image-quality gate on synthetic photos.
+
+Renders leaf-like photos and degraded copies of them (blurred, tiny, under-
+and overexposed, and no leaf at all), then reports for each kind how many
+pass the gate, with the mean of each measurement. It also reports the gate's
+cost per image, with and without the downscale, next to single-image
+inference on a synthetic model.
+
+Run from the repo root:
+    python -m benchmarks.bench_quality_gate --images 40
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from config import INFERENCE_BACKEND
+from inference import open_image, preprocess_image
+from quality_gate import assess, check_image, downscale
+
+SIZES = ((640, 480), (1600, 1200), (4000, 3000))
+
+
+def synthetic_leaf(width, height, seed=0):
+    # A leaf with veins and lesions on soil, so blur and scale behave like a photo
+    rng = np.random.default_rng(seed)
+    soil = np.array([110, 90, 60]) + rng.normal(0, 10, (height, width, 3))
+    image = Image.fromarray(soil.clip(0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(image)
+
+    cx, cy = width / 2 + rng.uniform(-0.05, 0.05) * width, height / 2
+    a, b = width * rng.uniform(0.3, 0.45), height * rng.uniform(0.25, 0.35)
+    green = (int(rng.integers(40, 90)), int(rng.integers(120, 170)), int(rng.integers(30, 70)))
+    draw.ellipse([cx - a, cy - b, cx + a, cy + b], fill=green)
+    draw.line([cx - a, cy, cx + a, cy], fill=(150, 190, 110), width=max(2, width // 200))
+    for i in range(-6, 7):
+        x, reach = cx + i * a / 7, b * 0.8 * (1 - abs(i) / 7)
+        for sign in (-1, 1):
+            draw.line([x, cy, x + a / 5, cy + sign * reach], fill=(130, 180, 100), width=max(1, width // 400))
+    for _ in range(int(rng.integers(0, 12))):
+        x, y, r = cx + rng.uniform(-a / 2, a / 2), cy + rng.uniform(-b / 2, b / 2), width / 60
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=(120, 80, 40))
+
+    pixels = np.asarray(image).astype(np.float32) + rng.normal(0, 4, (height, width, 3))
+    return Image.fromarray(pixels.clip(0, 255).astype(np.uint8))
+
+
+def degrade(image, kind, seed):
+    rng = np.random.default_rng(seed)
+    if kind == "good":
+        return image
+    if kind == "blurred":
+        return image.filter(ImageFilter.GaussianBlur(image.width * rng.uniform(0.004, 0.01)))
+    if kind == "tiny":
+        return image.resize((120, 90))
+    if kind == "underexposed":
+        return Image.fromarray((np.asarray(image) * rng.uniform(0.05, 0.12)).astype(np.uint8))
+    if kind == "overexposed":
+        return Image.fromarray((np.asarray(image).astype(np.float32) * rng.uniform(3.0, 5.0)).clip(0, 255).astype(np.uint8))
+    if kind == "no_leaf":
+        # Grey paper with text-like strokes: sharp and well exposed, but no plant
+        page = Image.new("RGB", image.size, (200, 200, 205))
+        draw = ImageDraw.Draw(page)
+        for y in range(40, image.height - 40, max(12, image.height // 30)):
+            draw.line([40, y, image.width - 40 - rng.integers(0, image.width // 3), y], fill=(40, 40, 50), width=max(2, image.height // 150))
+        return page
+    raise ValueError(kind)
+
+
+KINDS = ("good", "blurred", "tiny", "underexposed", "overexposed", "no_leaf")
+
+
+def jpeg(image):
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def run(count, model_runs):
+    results = {}
+    gate_ms, assess_ms = [], []
+
+    for kind in KINDS:
+        reports = []
+        for i in range(count):
+            width, height = SIZES[i % len(SIZES)]
+            image = open_image(io.BytesIO(jpeg(degrade(synthetic_leaf(width, height, seed=i), kind, seed=i))))
+            image.load()
+
+            start = time.perf_counter()
+            report = check_image(image)
+            gate_ms.append((time.perf_counter() - start) * 1000)
+
+            pixels = downscale(image)
+            start = time.perf_counter()
+            assess(pixels, image.size)
+            assess_ms.append((time.perf_counter() - start) * 1000)
+            reports.append(report)
+
+        results[kind] = {
+            "pass_rate": float(np.mean([r["ok"] for r in reports])),
+            "reasons": {reason: sum(reason in r["reasons"] for r in reports)
+                        for reason in sorted({reason for r in reports for reason in r["reasons"]})},
+            **{f"mean_{name}": float(np.mean([r[name] for r in reports])) for name in ("sharpness", "dark", "bright", "plant")},
+        }
+
+    report = {
+        "images_per_kind": count,
+        "kinds": results,
+        "gate_p50_ms": float(np.percentile(gate_ms, 50)),
+        "assess_only_p50_ms": float(np.percentile(assess_ms, 50)),
+    }
+
+    if model_runs:
+        from benchmarks.synthetic_models import write_synthetic_models
+        from model_registry import ModelRegistry
+
+        manifest = write_synthetic_models(os.path.join(tempfile.gettempdir(), "leafsense_bench_models"))
+        backend = ModelRegistry(manifest).get("Rice")
+        sample = preprocess_image(synthetic_leaf(640, 480))
+        backend.predict(sample)
+        timings = []
+        for _ in range(model_runs):
+            start = time.perf_counter()
+            backend.predict(sample)
+            timings.append((time.perf_counter() - start) * 1000)
+        report["backend"] = INFERENCE_BACKEND
+        report["inference_p50_ms"] = float(np.percentile(timings, 50))
+        report["gate_fraction_of_inference"] = report["gate_p50_ms"] / report["inference_p50_ms"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=30, help="images per kind")
+    parser.add_argument("--model-runs", type=int, default=50, help="single-image inference runs to compare against; 0 skips")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    result = run(args.images, args.model_runs)
+    for kind, row in result["kinds"].items():
+        reasons = ", ".join(f"{reason} {n}" for reason, n in row["reasons"].items()) or "-"
+        print(f"{kind:<14} pass {row['pass_rate'] * 100:>5.1f}%  sharp {row['mean_sharpness']:>7.1f}  "
+              f"dark {row['mean_dark']:.2f}  bright {row['mean_bright']:.2f}  plant {row['mean_plant']:.2f}  ({reasons})")
+    print(f"gate {result['gate_p50_ms']:.2f} ms per image ({result['assess_only_p50_ms']:.2f} ms without the downscale)")
+    if "inference_p50_ms" in result:
+        print(f"single-image inference {result['inference_p50_ms']:.2f} ms, "
+              f"gate = {result['gate_fraction_of_inference'] * 100:.1f}% of it")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,149 @@
+"""Latency and prediction changes of high-accuracy (TTA/ensemble) mode against the single-view path.
+
+Reports, per image, the single-view latency, the batched TTA latency, and the
+latency of running the same views as separate predict calls. It also reports
+how often TTA keeps the single-view top-1, plus the mean top-1 confidence of
+each mode. With --dataset (a tensor_dataset directory) it reports accuracy
+for both modes as well.
+
+Run from the repo root:
+    python -m benchmarks.bench_tta --images 50
+    python -m benchmarks.bench_tta --ensemble 2
+    python -m benchmarks.bench_tta --real-models --dataset datasets/rice_val
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from config import INFERENCE_BACKEND, TTA_VIEWS
+from inference import open_image, preprocess_image
+from tta import augmented_views, ensemble_members, predict_tta
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def load_images(dataset, count):
+    if dataset:
+        from tensor_dataset import load
+
+        images, labels, _ = load(dataset)
+        picks = np.linspace(0, len(images) - 1, num=min(count, len(images))).astype(int)
+        return [Image.fromarray(np.asarray(images[i])) for i in picks], labels[picks]
+
+    from benchmarks.bench_preprocess import synthetic_jpeg
+
+    sizes = ((640, 480), (1600, 1200))
+    images = [open_image(io.BytesIO(synthetic_jpeg(*sizes[i % len(sizes)], seed=i))) for i in range(count)]
+    for image in images:
+        image.load()
+    return images, None
+
+
+def synthetic_registry(backend, ensemble, crop):
+    from assets import load_class_names
+    from benchmarks.synthetic_models import build_model, write_synthetic_models
+    from model_registry import ModelRegistry, load_manifest
+
+    directory = os.path.join(tempfile.gettempdir(), "leafsense_bench_models")
+    manifest = dict(load_manifest(write_synthetic_models(directory)))
+    entry = dict(manifest[crop])
+
+    members = []
+    num_classes = len(load_class_names(entry["classes"]))
+    for seed in range(1, ensemble):
+        path = os.path.join(directory, f"{crop.lower()}_synthetic_member{seed}.keras")
+        if not os.path.exists(path):
+            build_model(num_classes, seed=100 + seed).save(path)
+        members.append(path)
+    manifest[crop] = dict(entry, ensemble=members)
+
+    manifest_path = os.path.join(directory, "models_tta.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    return ModelRegistry(manifest_path, backend=backend)
+
+
+def run(crop, count, views, ensemble, backend, dataset, real_models=False):
+    if real_models:
+        from model_registry import ModelRegistry
+
+        registry = ModelRegistry(backend=backend)
+    else:
+        registry = synthetic_registry(backend, ensemble, crop)
+    members = ensemble_members(registry, crop)
+    images, labels = load_images(dataset, count)
+
+    # Warm up every batch shape used below
+    predict_tta(members, images[0], views)
+    members[0].predict(preprocess_image(images[0]))
+
+    single_ms, tta_ms, sequential_ms = [], [], []
+    single_top, tta_top, single_conf, tta_conf = [], [], [], []
+
+    for image in images:
+        probs, ms = timed(lambda: np.asarray(members[0].predict(preprocess_image(image)))[0])
+        single_ms.append(ms)
+        single_top.append(int(np.argmax(probs)))
+        single_conf.append(float(probs.max()))
+
+        probs, ms = timed(lambda: predict_tta(members, image, views))
+        tta_ms.append(ms)
+        tta_top.append(int(np.argmax(probs)))
+        tta_conf.append(float(probs.max()))
+
+        # The same views as one predict call each, i.e. what batching saves
+        def one_by_one():
+            pixels = augmented_views(image, views).astype(np.float32) / 255.0
+            return [member.predict(pixels[i:i + 1]) for member in members for i in range(len(views))]
+        _, ms = timed(one_by_one)
+        sequential_ms.append(ms)
+
+    single_p50 = float(np.percentile(single_ms, 50))
+    report = {
+        "crop": crop,
+        "backend": backend,
+        "images": len(images),
+        "views": len(views),
+        "ensemble": len(members),
+        "single_p50_ms": single_p50,
+        "tta_p50_ms": float(np.percentile(tta_ms, 50)),
+        "sequential_p50_ms": float(np.percentile(sequential_ms, 50)),
+        "latency_multiple": float(np.percentile(tta_ms, 50)) / single_p50,
+        "sequential_multiple": float(np.percentile(sequential_ms, 50)) / single_p50,
+        "top1_agreement": float(np.mean(np.array(single_top) == np.array(tta_top))),
+        "single_mean_confidence": float(np.mean(single_conf)),
+        "tta_mean_confidence": float(np.mean(tta_conf)),
+    }
+    if labels is not None:
+        report["single_accuracy"] = float(np.mean(np.array(single_top) == labels))
+        report["tta_accuracy"] = float(np.mean(np.array(tta_top) == labels))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crop", default="Rice")
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--views", default=",".join(TTA_VIEWS), help="comma-separated view names")
+    parser.add_argument("--ensemble", type=int, default=1, help="checkpoints per crop, extra ones are synthetic")
+    parser.add_argument("--real-models", action="store_true", help="use static/models.json (and its ensembles) instead")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND)
+    parser.add_argument("--dataset", help="tensor_dataset directory with labels, for accuracy")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    result = run(args.crop, args.images, tuple(args.views.split(",")), args.ensemble, args.backend, args.dataset, args.real_models)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,100 @@
+"""Throughput and memory of the multi-process inference pool at increasing pool sizes.
+
+Each size runs the same concurrent single-image load through the pool and
+reports images/sec plus the summed RSS and PSS of the workers; PSS splits
+pages shared between processes (the mmapped TFLite weights), so it shows
+how much of the memory really scales with the worker count.
+
+Run from the repo root:
+    python -m benchmarks.bench_worker_pool --sizes 1 2 4 --requests 400
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import IMG_SIZE, MODEL_MANIFEST
+
+
+def memory_mb(pid):
+    # RSS from status, PSS from smaps_rollup (Linux only; None elsewhere)
+    values = {}
+    for path, field in ((f"/proc/{pid}/status", "VmRSS:"), (f"/proc/{pid}/smaps_rollup", "Pss:")):
+        try:
+            with open(path) as f:
+                line = next(line for line in f if line.startswith(field))
+            values[field.rstrip(":").lower()] = int(line.split()[1]) / 1024
+        except (OSError, StopIteration):
+            values[field.rstrip(":").lower()] = None
+    return values
+
+
+def run_size(size, crop, total, concurrency, manifest_path):
+    from worker_pool import InferenceWorkerPool
+
+    start = time.perf_counter()
+    pool = InferenceWorkerPool(size=size, preload=(crop,), manifest_path=manifest_path)
+    backend = pool.backend(crop)
+    sample = np.random.default_rng(0).random((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    for _ in range(size * 2):
+        backend.predict(sample)
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        list(callers.map(lambda _: backend.predict(sample), range(total)))
+    elapsed = time.perf_counter() - start
+
+    workers = [memory_mb(pid) for pid in pool.pids()]
+    pool.close()
+
+    def total_of(key):
+        values = [w[key] for w in workers]
+        return sum(values) if None not in values else None
+
+    return {
+        "size": size,
+        "startup_s": startup,
+        "images_per_sec": total / elapsed,
+        "workers_rss_mb": total_of("vmrss"),
+        "workers_pss_mb": total_of("pss"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--crop", default="Rice")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--real-models", action="store_true", help="use static/models.json instead of synthetic models")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    manifest = MODEL_MANIFEST
+    if not args.real_models:
+        from benchmarks.synthetic_models import write_synthetic_models
+        from model_registry import ModelRegistry
+
+        manifest = write_synthetic_models(os.path.join(tempfile.gettempdir(), "leafsense_bench_models"))
+        # The pool only serves converted models; loading once as tflite writes the artifacts
+        registry = ModelRegistry(manifest, backend="tflite")
+        for crop in registry.crops():
+            registry.get(crop)
+
+    report = {"parent": memory_mb(os.getpid()), "runs": []}
+    print(f"{'workers':>7} {'startup_s':>9} {'images/s':>9} {'rss_mb':>8} {'pss_mb':>8}")
+    for size in args.sizes:
+        row = run_size(size, args.crop, args.requests, args.concurrency, manifest)
+        report["runs"].append(row)
+        rss = f"{row['workers_rss_mb']:>8.1f}" if row["workers_rss_mb"] is not None else f"{'-':>8}"
+        pss = f"{row['workers_pss_mb']:>8.1f}" if row["workers_pss_mb"] is not None else f"{'-':>8}"
+        print(f"{size:>7} {row['startup_s']:>9.2f} {row['images_per_sec']:>9.1f} {rss} {pss}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,64 @@
+"""Load test the inference API and report latency percentiles and throughput.
+
+Start the API first (uvicorn api:app), then from the repo root:
+    python -m benchmarks.loadtest --crop Rice --requests 500 --concurrency 16
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api_client import RemoteInferenceError, predict_remote
+from benchmarks.bench_preprocess import synthetic_jpeg
+
+
+def run(url, crop, total, concurrency, width, height, distinct):
+    # Distinct images keep the prediction cache from answering requests; with the
+    # default of one image per request, every request runs the model
+    distinct = distinct or total
+    images = [synthetic_jpeg(width, height, seed=i) for i in range(distinct)]
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            predict_remote(url, crop, images[i % distinct])
+            ok = True
+        except (RemoteInferenceError, OSError):
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    # Make sure the model is loaded, with an image none of the timed requests use
+    predict_remote(url, crop, synthetic_jpeg(width, height, seed=distinct))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([ms for ms, ok in outcomes if ok])
+    return {
+        "requests": total,
+        "cache_hits_expected": total - min(total, distinct),
+        "errors": sum(not ok for _, ok in outcomes),
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "rps": len(latencies) / wall,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--crop", default="Rice")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct images to cycle through (default: one per request, so nothing is answered from the prediction cache)")
+    args = parser.parse_args()
+
+    report = run(args.url, args.crop, args.requests, args.concurrency, args.width, args.height, args.distinct)
+    print(f"requests={report['requests']} errors={report['errors']} cache_hits_expected={report['cache_hits_expected']} "
+          f"p50={report['p50_ms']:.1f}ms p99={report['p99_ms']:.1f}ms rps={report['rps']:.1f}")
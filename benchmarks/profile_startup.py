@@ -0,0 +1,152 @@
+"""Profile how long the Streamlit app takes to start.
+
+Two measurements, each in a fresh interpreter:
+- import time: `python -X importtime` over the modules app.py imports at top
+  level. The list is read from app.py itself, so it follows the code. The
+  report includes the heavy packages that got pulled in.
+- time to first render: app.py run once under Streamlit's AppTest, up to the
+  login page. This needs streamlit installed and the Firebase secrets in
+  .streamlit/secrets.toml.
+
+--baseline profiles another git revision in a temporary worktree, so one run
+shows before and after:
+    python -m benchmarks.profile_startup --baseline HEAD~1
+    python -m benchmarks.profile_startup --output startup.json
+    python -m benchmarks.profile_startup --compare startup.json
+"""
+import argparse
+import ast
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("tensorflow", "keras", "pandas", "pyrebase", "firebase_admin", "google.cloud.firestore")
+
+
+def app_imports(root):
+    with open(os.path.join(root, "app.py"), "r") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return modules
+
+
+def run_python(root, code, *flags):
+    env = dict(os.environ, PYTHONPATH=root)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, "-c", code], cwd=root, env=env, capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | name", nested imports indented under their parent
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        yield name.strip(), int(cumulative) / 1000, name[1:].startswith(" ")
+
+
+def import_profile(root):
+    modules = app_imports(root)
+    code = "\n".join(
+        f"try:\n    import {name}\nexcept Exception as e:\n    print('MISSING', {name!r}, type(e).__name__, e)"
+        for name in modules
+    )
+    result, wall = run_python(root, code, "-X", "importtime")
+    interpreter, _ = run_python(root, "pass", "-X", "importtime")
+    startup = {name for name, _, _ in parse_importtime(interpreter.stderr)}
+
+    top_level, imported = {}, set()
+    for name, cumulative_ms, nested in parse_importtime(result.stderr):
+        imported.add(name)
+        if not nested and name not in startup:
+            top_level[name] = cumulative_ms
+    missing = [line.split(" ", 2)[1] for line in result.stdout.splitlines() if line.startswith("MISSING")]
+
+    return {
+        "wall_s": wall,
+        "import_ms": sum(top_level.values()),
+        "slowest_ms": dict(sorted(top_level.items(), key=lambda item: -item[1])[:10]),
+        "heavy_imported": [name for name in HEAVY_MODULES if name in imported and name not in missing],
+        "missing": missing,
+    }
+
+
+def first_render(root):
+    code = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "at = AppTest.from_file('app.py', default_timeout=600)\n"
+        "at.run()\n"
+        "print(json.dumps({'first_render_s': time.perf_counter() - start,"
+        " 'exceptions': [e.message for e in at.exception]}))\n"
+    )
+    result, wall = run_python(root, code)
+    if result.returncode != 0 or not result.stdout.strip():
+        return {"first_render_s": None, "error": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+    return dict(json.loads(result.stdout.strip().splitlines()[-1]), wall_s=wall)
+
+
+def profile(root):
+    return {"imports": import_profile(root), "render": first_render(root)}
+
+
+def profile_revision(ref):
+    # A throwaway worktree of ref, sharing this checkout's static files and secrets
+    directory = tempfile.mkdtemp(prefix="leafsense_startup_")
+    subprocess.run(["git", "worktree", "add", "--detach", directory, ref], check=True, capture_output=True)
+    try:
+        for extra in ("models", ".streamlit"):
+            if os.path.exists(extra) and not os.path.exists(os.path.join(directory, extra)):
+                os.symlink(os.path.abspath(extra), os.path.join(directory, extra))
+        return profile(directory)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", directory], capture_output=True)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_report(name, report):
+    imports, render = report["imports"], report["render"]
+    print(f"{name}: imports {imports['import_ms']:.0f} ms, first render "
+          + (f"{render['first_render_s']:.2f} s" if render.get("first_render_s") is not None else f"n/a ({render.get('error')})"))
+    print(f"  heavy modules imported: {', '.join(imports['heavy_imported']) or 'none'}")
+    if imports["missing"]:
+        print(f"  failed to import here: {', '.join(imports['missing'])}")
+    for module, ms in imports["slowest_ms"].items():
+        print(f"  {module:<30} {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    from benchmarks.bench_inference import compare, git_commit
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="git revision to profile as well, e.g. HEAD~1")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = {"current": dict(profile(os.getcwd()), commit=git_commit())}
+    if args.baseline:
+        report["baseline"] = dict(profile_revision(args.baseline), commit=args.baseline)
+        print_report(args.baseline, report["baseline"])
+    print_report("current", report["current"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f)["current"], report["current"])
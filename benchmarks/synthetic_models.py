@@ -0,0 +1,40 @@
+"""Small stand-in Keras models with the real 224x224x3 input, for running benchmarks without the weights."""
+import json
+import os
+
+import tensorflow as tf
+
+from config import IMG_SIZE
+from model_registry import load_manifest
+
+
+def build_model(num_classes, width=16, seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input((IMG_SIZE, IMG_SIZE, 3))
+    x = tf.keras.layers.Conv2D(width, 3, strides=2, activation="relu")(inputs)
+    x = tf.keras.layers.Conv2D(width * 2, 3, strides=2, activation="relu")(x)
+    x = tf.keras.layers.Conv2D(width * 4, 3, strides=2, activation="relu")(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def write_synthetic_models(directory, width=16):
+    # Saves one stand-in model per crop in the real manifest and returns the path of
+    # a manifest pointing at them; class lists and images are the real ones
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+
+    for seed, (crop, entry) in enumerate(load_manifest().items()):
+        with open(entry["classes"], "r") as f:
+            num_classes = sum(1 for line in f if line.strip())
+
+        path = os.path.join(directory, f"{crop.lower()}_synthetic.keras")
+        if not os.path.exists(path):
+            build_model(num_classes, width=width, seed=seed).save(path)
+        manifest[crop] = dict(entry, path=path, version="synthetic")
+
+    manifest_path = os.path.join(directory, "models.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest_path
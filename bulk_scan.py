@@ -0,0 +1,238 @@
+"""Scan a directory or archive of leaf photos offline and write the results to CSV or Parquet.
+
+    python bulk_scan.py --crop Rice photos/ results.csv
+    python bulk_scan.py --crop Pulses --processes --workers 4 plot7.zip results.parquet
+
+Interrupted runs can be restarted with the same arguments; images already in the
+output are skipped.
+"""
+import argparse
+import csv
+import io
+import multiprocessing as mp
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from config import IMG_SIZE, QUALITY_GATE_ENABLED
+from inference import BATCH_SIZE, IMAGE_EXTENSIONS, describe, get_class_names, open_image, resize_to_model, top_k
+from quality_gate import check_image, describe_rejection
+
+COLUMNS = ["file", "crop", "plant", "disease", "confidence", "status", "error"]
+
+
+# ---------- INPUT ----------
+
+def iter_sources(path):
+    # Yields (name, source) lazily; source is a file path, or the member bytes for archives
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    full = os.path.join(root, filename)
+                    yield os.path.relpath(full, path), full
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield info.filename, zf.read(info)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as tf:
+            for member in tf:
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.name, tf.extractfile(member).read()
+    else:
+        raise ValueError(f"{path} is not a directory, zip or tar archive")
+
+
+def decode(source, gate=False):
+    # Runs in the decode pool; returns uint8 pixels so process pools pickle 150 KB, not 600 KB.
+    # With gate, images failing the quality gate come back as errors and skip the model.
+    try:
+        image = open_image(io.BytesIO(source) if isinstance(source, bytes) else source)
+        if gate:
+            report = check_image(image)
+            if not report["ok"]:
+                return None, describe_rejection(report)
+        return resize_to_model(image), None
+    except Exception as e:
+        return None, str(e)
+
+
+# ---------- OUTPUT ----------
+
+class CsvSink:
+
+    def __init__(self, path):
+        self.path = path
+
+    def done(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="") as f:
+            return {row["file"] for row in csv.DictReader(f)}
+
+    def __enter__(self):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if new:
+            self._writer.writeheader()
+        return self
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class ParquetSink:
+    # A directory of part files; every completed part survives an interruption
+
+    def __init__(self, path, rows_per_part=5000):
+        import pyarrow  # noqa: F401  (fail early if the optional dependency is missing)
+
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self._pending = []
+
+    def done(self):
+        import pyarrow.parquet as pq
+
+        if not os.path.isdir(self.path):
+            return set()
+        return {name for part in sorted(os.listdir(self.path)) if part.endswith(".parquet")
+                for name in pq.read_table(os.path.join(self.path, part), columns=["file"]).column("file").to_pylist()}
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._part = len([p for p in os.listdir(self.path) if p.endswith(".parquet")])
+        return self
+
+    def write(self, rows):
+        self._pending.extend(rows)
+        if len(self._pending) >= self.rows_per_part:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._pending:
+            return
+        table = pa.Table.from_pylist(self._pending, schema=pa.schema([
+            ("file", pa.string()), ("crop", pa.string()), ("plant", pa.string()), ("disease", pa.string()),
+            ("confidence", pa.float64()), ("status", pa.string()), ("error", pa.string()),
+        ]))
+        part_path = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        pq.write_table(table, part_path + ".tmp")
+        os.replace(part_path + ".tmp", part_path)
+        self._part += 1
+        self._pending = []
+
+    def __exit__(self, *exc):
+        self._flush()
+
+
+def make_sink(path):
+    return ParquetSink(path) if path.endswith(".parquet") else CsvSink(path)
+
+
+# ---------- SCAN ----------
+
+def decode_pool(workers, processes):
+    if processes:
+        # spawn, not fork: the backend has already started TensorFlow's threads, which do not survive a fork
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def scan(input_path, output_path, crop, backend, batch_size=BATCH_SIZE, workers=4, processes=False, gate=QUALITY_GATE_ENABLED,
+         log=sys.stderr):
+    class_names = get_class_names(crop)
+    sink = make_sink(output_path)
+    done = sink.done()
+
+    max_in_flight = batch_size * 2
+    batch = np.zeros((batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+    scanned = 0
+    skipped = 0
+    start = time.perf_counter()
+
+    def infer(items, out):
+        # items: (name, pixels, error) from the decode pool
+        ok = [(name, pixels) for name, pixels, error in items if error is None]
+        rows = [{"file": name, "crop": crop, "error": error} for name, _, error in items if error is not None]
+
+        for i, (_, pixels) in enumerate(ok):
+            np.divide(pixels, np.float32(255.0), out=batch[i], dtype=np.float32)
+        if ok:
+            preds = np.asarray(backend.predict(batch[:len(ok)]))
+            for (name, _), probs in zip(ok, preds):
+                idx = int(top_k(probs, 1)[0])
+                result = describe(idx, float(probs[idx]), class_names, crop)
+                rows.append({"file": name, "crop": crop, "plant": result["plant"], "disease": result["disease"],
+                             "confidence": result["confidence"], "status": result["status"], "error": None})
+        out.write(rows)
+        return len(items)
+
+    with sink as out, decode_pool(workers, processes) as pool:
+        # At most max_in_flight decoded images exist at once, whatever the input size
+        in_flight = deque()
+        pending = []
+
+        def drain(until):
+            nonlocal scanned
+            while len(in_flight) > until:
+                name, future = in_flight.popleft()
+                pixels, error = future.result()
+                pending.append((name, pixels, error))
+                if len(pending) == batch_size:
+                    scanned += infer(pending, out)
+                    pending.clear()
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{scanned} scanned, {skipped} skipped, {scanned / elapsed:.1f} images/sec", end="", file=log)
+
+        for name, source in iter_sources(input_path):
+            if name in done:
+                skipped += 1
+                continue
+            in_flight.append((name, pool.submit(decode, source, gate)))
+            drain(max_in_flight)
+
+        drain(0)
+        if pending:
+            scanned += infer(pending, out)
+
+    elapsed = time.perf_counter() - start
+    rate = scanned / elapsed if elapsed > 0 else 0.0
+    print(f"\r{scanned} scanned, {skipped} skipped, {rate:.1f} images/sec in {elapsed:.1f}s", file=log)
+    return scanned, skipped, rate
+
+
+if __name__ == "__main__":
+    from model_registry import ModelRegistry, load_manifest
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="directory, .zip or .tar(.gz) of leaf images")
+    parser.add_argument("output", help="results .csv, or .parquet directory (needs pyarrow)")
+    parser.add_argument("--crop", required=True, choices=list(load_manifest()))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="decode pool size")
+    parser.add_argument("--processes", action="store_true", help="decode in processes instead of threads")
+    parser.add_argument("--no-quality-gate", action="store_true", help="send every image to the model")
+    args = parser.parse_args()
+
+    scan(args.input, args.output, args.crop, ModelRegistry().get(args.crop),
+         batch_size=args.batch_size, workers=args.workers, processes=args.processes,
+         gate=QUALITY_GATE_ENABLED and not args.no_quality_gate)
@@ -0,0 +1,67 @@
+import os
+
+IMG_SIZE = 224
+
+# Crops, model files and class lists; add a crop by adding an entry here
+MODEL_MANIFEST = os.environ.get("LEAFSENSE_MODEL_MANIFEST", "static/models.json")
+
+# How many crop models may be resident at once before the least recently used is evicted
+MAX_RESIDENT_MODELS = int(os.environ.get("LEAFSENSE_MAX_RESIDENT_MODELS", "2"))
+
+# Inference backend used by the app: keras, tf_function, savedmodel or tflite
+INFERENCE_BACKEND = os.environ.get("LEAFSENSE_BACKEND", "tf_function")
+
+# Weight format for the tflite backend: float32, float16, dynamic or int8
+TFLITE_QUANTIZATION = os.environ.get("LEAFSENSE_TFLITE_QUANTIZATION", "float16")
+
+# In-memory prediction cache entries, and an optional SQLite file that survives restarts
+PREDICTION_CACHE_SIZE = int(os.environ.get("LEAFSENSE_PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_PATH = os.environ.get("LEAFSENSE_PREDICTION_CACHE_PATH") or None
+
+# Base URL of the HTTP inference service (api.py); when set the UI sends single-leaf scans there
+INFERENCE_API_URL = os.environ.get("LEAFSENSE_API_URL") or None
+
+# Micro-batching of concurrent single-image requests: largest batch, and how long the first request may wait for company
+BATCHER_MAX_BATCH_SIZE = int(os.environ.get("LEAFSENSE_BATCHER_MAX_BATCH_SIZE", "16"))
+BATCHER_MAX_WAIT_MS = float(os.environ.get("LEAFSENSE_BATCHER_MAX_WAIT_MS", "5"))
+# Longest a caller waits on the batcher; generous, since a batch can include a model load
+BATCHER_TIMEOUT_S = float(os.environ.get("LEAFSENSE_BATCHER_TIMEOUT_S", "120"))
+
+# Per-stage timing and error counters; when off, spans are a shared no-op object
+METRICS_ENABLED = os.environ.get("LEAFSENSE_METRICS", "1") not in ("0", "false", "False", "")
+
+# Port for the Streamlit process's /metrics endpoint; unset means no endpoint
+METRICS_PORT = int(os.environ["LEAFSENSE_METRICS_PORT"]) if os.environ.get("LEAFSENSE_METRICS_PORT") else None
+
+# Multi-process inference: run models in this many worker processes (0 = one per available core) when enabled
+USE_WORKER_POOL = os.environ.get("LEAFSENSE_USE_WORKER_POOL", "0") not in ("0", "false", "False", "")
+WORKER_POOL_SIZE = int(os.environ.get("LEAFSENSE_WORKER_POOL_SIZE", "0"))
+
+# Signed-in sessions: refresh the Firebase ID token this many seconds before it expires, and forget sessions idle this long
+AUTH_REFRESH_MARGIN = int(os.environ.get("LEAFSENSE_AUTH_REFRESH_MARGIN", "300"))
+AUTH_SESSION_IDLE_TIMEOUT = int(os.environ.get("LEAFSENSE_AUTH_SESSION_IDLE_TIMEOUT", str(7 * 24 * 3600)))
+# Lifetime of the single-use resume ticket kept in the page URL so a reload can skip signing in
+AUTH_RESUME_TICKET_TTL = int(os.environ.get("LEAFSENSE_AUTH_RESUME_TICKET_TTL", "600"))
+
+# host:port of a local Firebase Auth emulator; firebase_admin reads the same variable
+AUTH_EMULATOR_HOST = os.environ.get("FIREBASE_AUTH_EMULATOR_HOST") or None
+
+# Local SQLite copy of every user's scans, the primary read and write path; synced with Firestore in the background
+LOCAL_STORE_PATH = os.environ.get("LEAFSENSE_LOCAL_STORE", "leafsense_scans.db")
+SYNC_INTERVAL = float(os.environ.get("LEAFSENSE_SYNC_INTERVAL", "30"))
+
+# High-accuracy mode: augmented views averaged per image (see tta.augmented_views)
+TTA_VIEWS = tuple(os.environ.get(
+    "LEAFSENSE_TTA_VIEWS", "identity,hflip,vflip,hvflip,crop90,hflip_crop90,crop80,hflip_crop80"
+).split(","))
+
+# Image-quality gate run before inference; images failing any check skip the model.
+# Sharpness is the Laplacian variance of a 128x128 grey copy, exposure limits are
+# the fraction of pixels crushed to black or blown to white, and plant presence is
+# the fraction of yellow-to-green pixels
+QUALITY_GATE_ENABLED = os.environ.get("LEAFSENSE_QUALITY_GATE", "1") not in ("0", "false", "False", "")
+QUALITY_MIN_SIDE = int(os.environ.get("LEAFSENSE_QUALITY_MIN_SIDE", "160"))
+QUALITY_MIN_SHARPNESS = float(os.environ.get("LEAFSENSE_QUALITY_MIN_SHARPNESS", "20"))
+QUALITY_MAX_DARK = float(os.environ.get("LEAFSENSE_QUALITY_MAX_DARK", "0.4"))
+QUALITY_MAX_BRIGHT = float(os.environ.get("LEAFSENSE_QUALITY_MAX_BRIGHT", "0.4"))
+QUALITY_MIN_PLANT = float(os.environ.get("LEAFSENSE_QUALITY_MIN_PLANT", "0.15"))
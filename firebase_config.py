@@ -1,6 +1,9 @@
 import streamlit as st
 import pyrebase
 
+from auth_session import RestAuthClient
+from config import AUTH_EMULATOR_HOST
+
 config = {
     "apiKey": st.secrets["firebase_web"]["API_KEY"],
     "authDomain": st.secrets["firebase_web"]["AuthDomain"],
@@ -11,5 +14,8 @@ config = {
     "databaseURL": st.secrets["firebase_web"]["DatabaseURL"]
 }
 
-firebase = pyrebase.initialize_app(config)
-auth = firebase.auth()
\ No newline at end of file
+if AUTH_EMULATOR_HOST:
+    auth = RestAuthClient(config["apiKey"], emulator_host=AUTH_EMULATOR_HOST)
+else:
+    firebase = pyrebase.initialize_app(config)
+    auth = firebase.auth()
@@ -0,0 +1,169 @@
+import io
+import time
+import zipfile
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from assets import load_class_names
+from batcher import padded_size
+from config import IMG_SIZE, QUALITY_GATE_ENABLED
+from model_registry import load_manifest
+from prediction_cache import CACHED_TOP_K, image_key
+from quality_gate import check_image, describe_rejection
+
+BATCH_SIZE = 32
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+# ---------- CLASS NAMES ----------
+
+def get_class_names(choice):
+    entry = load_manifest().get(choice)
+    if entry is None:
+        return ()
+    return load_class_names(entry["classes"])
+
+
+def parse_label(label, crop):
+    if "___" in label:
+        plant, disease = label.split("___")
+    else:
+        plant, disease = crop, label
+    return plant, disease
+
+
+# ---------- PREPROCESSING ----------
+
+def open_image(source):
+    # JPEG draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale, which is
+    # most of the cost on 12 MP phone photos; never goes below the model size
+    image = source if isinstance(source, Image.Image) else Image.open(source)
+    if image.format == "JPEG":
+        image.draft("RGB", (IMG_SIZE, IMG_SIZE))
+    return ImageOps.exif_transpose(image)
+
+
+def resize_to_model(image):
+    # (224, 224, 3) uint8 pixels, before normalisation
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image = image.resize((IMG_SIZE, IMG_SIZE), Image.BICUBIC, reducing_gap=3.0)
+    return np.asarray(image)
+
+
+def preprocess_into(image, out):
+    # Resize and normalise straight into out, a (224, 224, 3) float32 view
+    np.divide(resize_to_model(image), np.float32(255.0), out=out, dtype=np.float32)
+    return out
+
+
+def preprocess_image(image):
+    img = np.empty((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    preprocess_into(image, img[0])
+    return img
+
+
+def iter_uploaded_images(files):
+    # Yields (name, file-like) for every image, expanding zip archives in place
+    for f in files:
+        name = getattr(f, "name", "upload")
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(f) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    with zf.open(info) as fh:
+                        yield info.filename, io.BytesIO(fh.read())
+        else:
+            yield name, f
+
+
+# ---------- BATCH INFERENCE ----------
+
+def predict_batch(backend, images, batch_size=BATCH_SIZE):
+    # Chunks are zero padded up to a power of two, like the micro-batcher does, so
+    # backends only see a few batch shapes and a handful of images is not run as 32
+    batch = np.zeros((padded_size(len(images), batch_size), IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    outputs = []
+
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        padded = batch[:padded_size(len(chunk), batch_size)]
+        for i, image in enumerate(chunk):
+            preprocess_into(image, padded[i])
+        padded[len(chunk):] = 0.0
+        preds = np.asarray(backend.predict(padded))
+        outputs.append(preds[:len(chunk)])
+
+    if not outputs:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate(outputs, axis=0)
+
+
+def top_k(probs, k=CACHED_TOP_K):
+    return np.argsort(probs)[-k:][::-1]
+
+
+def predict_tops(backend, images, crop, batch_size=BATCH_SIZE, cache=None, version=None, k=CACHED_TOP_K):
+    # Top-k (class index, probability) pairs per image; cached images skip the model
+    keys = [image_key(crop, version, image) for image in images] if cache else [None] * len(images)
+    tops = [cache.get(key) for key in keys] if cache else [None] * len(images)
+    pending = [i for i, top in enumerate(tops) if top is None]
+
+    preds = predict_batch(backend, [images[i] for i in pending], batch_size=batch_size)
+    for i, probs in zip(pending, preds):
+        tops[i] = [(int(j), float(probs[j])) for j in top_k(probs)]
+        if cache:
+            cache.put(keys[i], tops[i])
+    return [top[:k] for top in tops]
+
+
+def describe(idx, prob, class_names, crop):
+    label = class_names[idx] if idx < len(class_names) else "Unknown"
+    plant, disease = parse_label(label, crop)
+    is_healthy = "healthy" in disease.lower()
+    return {
+        "index": idx,
+        "label": label,
+        "plant": plant,
+        "disease": disease.replace("_", " "),
+        "confidence": prob * 100,
+        "status": "Healthy" if is_healthy else "Infected",
+    }
+
+
+def decode_all(named_files, gate=QUALITY_GATE_ENABLED):
+    # Images the quality gate rejects are reported in failed and never reach the model
+    names, images, failed = [], [], []
+    for name, fh in named_files:
+        try:
+            image = open_image(fh)
+            image.load()
+        except Exception as e:
+            failed.append((name, str(e)))
+            continue
+        if gate:
+            report = check_image(image)
+            if not report["ok"]:
+                failed.append((name, describe_rejection(report)))
+                continue
+        names.append(name)
+        images.append(image)
+    return names, images, failed
+
+
+def run_batch(backend, named_files, crop, class_names, batch_size=BATCH_SIZE, cache=None, version=None):
+    start = time.perf_counter()
+    names, images, failed = decode_all(named_files)
+    tops = predict_tops(backend, images, crop, batch_size=batch_size, cache=cache, version=version)
+    elapsed = time.perf_counter() - start
+
+    results = []
+    for name, top in zip(names, tops):
+        result = describe(*top[0], class_names, crop)
+        del result["index"], result["label"]
+        results.append(dict(file=name, **result))
+
+    images_per_sec = len(images) / elapsed if elapsed > 0 else 0.0
+    return results, failed, images_per_sec
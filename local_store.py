@@ -0,0 +1,374 @@
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import metrics
+from config import LOCAL_STORE_PATH, SYNC_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes; each record is one write
+MAX_BATCH_WRITES = 500
+
+# Remote pulls re-read this much before the watermark, so records committed
+# out of order around it are not missed; inserts are idempotent
+PULL_OVERLAP = timedelta(seconds=60)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    date TEXT NOT NULL,
+    plant TEXT,
+    disease TEXT,
+    confidence REAL,
+    status TEXT,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scans_by_user_date ON scans (email, date DESC);
+CREATE INDEX IF NOT EXISTS scans_unsynced ON scans (synced) WHERE synced = 0;
+CREATE TABLE IF NOT EXISTS pulls (
+    email TEXT PRIMARY KEY,
+    pulled_until TEXT
+);
+CREATE TABLE IF NOT EXISTS summary_counts (
+    email TEXT NOT NULL,
+    path TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (email, path)
+);
+"""
+
+FIELDS = ("plant", "disease", "confidence", "status")
+
+
+def to_iso(value):
+    # Fixed-width UTC text, so string order in SQLite is time order
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def from_iso(value):
+    return datetime.fromisoformat(value)
+
+
+# ---------- AGGREGATES ----------
+
+def summarize(records):
+    # Per-user counter deltas for a group of scan records; days are UTC
+    deltas = {}
+    for record in records:
+        summary = deltas.setdefault(record["email"], {"total": 0, "status": {}, "by_crop": {}, "by_disease": {}, "by_day": {}})
+        day = summary["by_day"].setdefault(to_iso(record["date"])[:10], {"total": 0})
+        status = record["status"]
+
+        summary["total"] += 1
+        summary["status"][status] = summary["status"].get(status, 0) + 1
+        summary["by_crop"][record["plant"]] = summary["by_crop"].get(record["plant"], 0) + 1
+        summary["by_disease"][record["disease"]] = summary["by_disease"].get(record["disease"], 0) + 1
+        day["total"] += 1
+        day[status] = day.get(status, 0) + 1
+    return deltas
+
+
+def flatten_counts(summary, path=()):
+    # (JSON key path, count) for every leaf of a summary dict
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            yield from flatten_counts(value, path + (key,))
+        else:
+            yield json.dumps(path + (key,)), value
+
+
+# ---------- LOCAL STORE ----------
+
+class LocalStore:
+    # The primary copy of every user's scans on this machine; Firestore is
+    # brought in line by SyncWorker whenever the link allows. Per-user counters
+    # live in summary_counts and are bumped in the same transaction as the
+    # scan rows they count, so the History page never regroups the scans.
+
+    def __init__(self, path=LOCAL_STORE_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._backfill_counts()
+
+    def add(self, record):
+        scan_id = record.get("id") or uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO scans (id, email, date, plant, disease, confidence, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scan_id, record["email"], to_iso(record["date"]), *(record[f] for f in FIELDS)),
+            )
+            self._count([record])
+            self._db.commit()
+        return scan_id
+
+    def history(self, email, limit, offset=0):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT date, plant, disease, confidence, status FROM scans WHERE email = ? "
+                "ORDER BY date DESC LIMIT ? OFFSET ?",
+                (email, limit, offset),
+            ).fetchall()
+        return [
+            {"date": from_iso(date).strftime("%Y-%m-%d %H:%M"), "plant": plant, "disease": disease,
+             "confidence": confidence, "status": status}
+            for date, plant, disease, confidence, status in rows
+        ]
+
+    def count(self, email):
+        with self._lock:
+            row = self._db.execute("SELECT n FROM summary_counts WHERE email = ? AND path = ?",
+                                   (email, json.dumps(("total",)))).fetchone()
+        return row[0] if row else 0
+
+    def summary(self, email):
+        # Same shape as summarize(), read from the user's precomputed counters
+        summary = {"total": 0, "status": {}, "by_crop": {}, "by_disease": {}, "by_day": {}}
+        with self._lock:
+            rows = self._db.execute("SELECT path, n FROM summary_counts WHERE email = ?", (email,)).fetchall()
+        for path, n in rows:
+            *parents, leaf = json.loads(path)
+            node = summary
+            for key in parents:
+                node = node.setdefault(key, {})
+            node[leaf] = n
+        return summary
+
+    def _count(self, records):
+        # Caller holds self._lock and commits; records must be newly inserted scans
+        self._db.executemany(
+            "INSERT INTO summary_counts (email, path, n) VALUES (?, ?, ?) "
+            "ON CONFLICT (email, path) DO UPDATE SET n = n + excluded.n",
+            [(email, path, n) for email, delta in summarize(records).items() for path, n in flatten_counts(delta)],
+        )
+
+    def _backfill_counts(self):
+        # Stores created before summary_counts existed get their counters once, from the scans
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM summary_counts LIMIT 1").fetchone():
+                return
+            rows = self._db.execute("SELECT email, date, plant, disease, status FROM scans").fetchall()
+            self._count([{"email": email, "date": from_iso(date), "plant": plant, "disease": disease, "status": status}
+                         for email, date, plant, disease, status in rows])
+            self._db.commit()
+
+    # ---------- sync bookkeeping ----------
+
+    def pending(self, limit=MAX_BATCH_WRITES):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, email, date, plant, disease, confidence, status FROM scans WHERE synced = 0 "
+                "ORDER BY date LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"id": scan_id, "email": email, "date": from_iso(date), "plant": plant, "disease": disease,
+             "confidence": confidence, "status": status}
+            for scan_id, email, date, plant, disease, confidence, status in rows
+        ]
+
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scans WHERE synced = 0").fetchone()[0]
+
+    def mark_synced(self, ids):
+        with self._lock:
+            self._db.executemany("UPDATE scans SET synced = 1 WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def merge_remote(self, email, records):
+        # records: dicts with id, date and FIELDS; returns how many rows were added or marked synced.
+        # Only rows new to this store are counted; known ones are just marked synced.
+        with self._lock:
+            added, changed = [], 0
+            for r in records:
+                if not r.get("date"):
+                    continue
+                cursor = self._db.execute(
+                    "INSERT INTO scans (id, email, date, plant, disease, confidence, status, synced) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 1) ON CONFLICT (id) DO NOTHING",
+                    (r["id"], email, to_iso(r["date"]), *(r.get(f) for f in FIELDS)),
+                )
+                if cursor.rowcount > 0:
+                    added.append({"email": email, "date": r["date"], **{f: r.get(f) for f in FIELDS}})
+                else:
+                    cursor = self._db.execute("UPDATE scans SET synced = 1 WHERE id = ? AND synced = 0", (r["id"],))
+                changed += cursor.rowcount
+            self._count(added)
+            self._db.commit()
+        return changed
+
+    def pulled_until(self, email):
+        with self._lock:
+            row = self._db.execute("SELECT pulled_until FROM pulls WHERE email = ?", (email,)).fetchone()
+        return from_iso(row[0]) if row and row[0] else None
+
+    def set_pulled_until(self, email, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO pulls (email, pulled_until) VALUES (?, ?)", (email, to_iso(value)))
+            self._db.commit()
+
+
+# ---------- SYNC BACKENDS ----------
+
+class FirestoreBackend:
+
+    def __init__(self, db):
+        self.db = db
+
+    def history_ref(self, email):
+        return self.db.collection("users").document(email).collection("history")
+
+    def commit(self, records):
+        # Writes are set() under the record's own id, so replaying a batch after a lost ack
+        # or a crash before mark_synced leaves Firestore unchanged; counters are kept
+        # locally (LocalStore.summary), where each record is counted exactly once
+        from firebase_admin import firestore
+
+        batch = self.db.batch()
+        for record in records:
+            data = dict(record)
+            email = data.pop("email")
+            ref = self.history_ref(email).document(data.pop("id", None))
+            data["synced_at"] = firestore.SERVER_TIMESTAMP
+            batch.set(ref, data)
+        batch.commit()
+
+    def pull(self, email, since=None):
+        # The user's records committed after `since`, or all of them, as dicts with their document id
+        from firebase_admin import firestore
+
+        query = self.history_ref(email)
+        if since is not None:
+            query = query.where(filter=firestore.FieldFilter("synced_at", ">", since)).order_by("synced_at")
+        return [dict(doc.to_dict(), id=doc.id) for doc in query.stream()]
+
+
+class InMemoryBackend:
+    # Stand-in for FirestoreBackend in tests and offline runs; fail_times simulates an outage
+
+    def __init__(self, fail_times=0):
+        self.records = {}
+        self.commits = 0
+        self.fail_times = fail_times
+
+    def commit(self, records):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("simulated Firestore outage")
+        now = datetime.now(timezone.utc)
+        for record in records:
+            self.records[record["id"]] = dict(record, synced_at=now)
+        self.commits += 1
+
+    def pull(self, email, since=None):
+        return [dict(r) for r in self.records.values() if r["email"] == email and (since is None or r["synced_at"] > since)]
+
+
+# ---------- SYNC ----------
+
+class SyncWorker:
+    # Pushes unsynced local scans to the backend and pulls remote scans newer
+    # than their watermark for the users active_users() returns, i.e. those with
+    # a live session, on a timer or when woken. Users who signed out cost no
+    # Firestore reads. Failures back off exponentially; nothing is dropped,
+    # since pending records simply stay in SQLite until a push succeeds.
+
+    def __init__(self, store, backend, active_users=tuple, interval=SYNC_INTERVAL, base_delay=1.0, max_delay=300.0):
+        self.store = store
+        self.backend = backend
+        self.active_users = active_users
+        self.interval = interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.last_success = None
+        self._pulled = set()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="scan-sync", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def wake(self):
+        self._wake.set()
+
+    def track(self, email):
+        # A user who just signed in is pulled now rather than on the next tick
+        if email not in self._pulled:
+            self.wake()
+
+    def close(self, timeout=5.0):
+        # Bounded, so an exit while offline is not held up by Firestore retries;
+        # whatever was not pushed stays pending in SQLite for the next start
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def sync_once(self):
+        self.push()
+        users = set(self.active_users())
+        for email in users:
+            self.pull(email)
+        self._pulled = users
+
+    def push(self):
+        while True:
+            records = self.store.pending()
+            if not records:
+                return
+            try:
+                self.backend.commit(records)
+            except Exception:
+                metrics.inc("firestore_errors_total", op="push")
+                raise
+            self.store.mark_synced([r["id"] for r in records])
+
+    def pull(self, email):
+        since = self.store.pulled_until(email)
+        try:
+            records = self.backend.pull(email, since - PULL_OVERLAP if since else None)
+        except Exception:
+            metrics.inc("firestore_errors_total", op="pull")
+            raise
+        self.store.merge_remote(email, records)
+
+        stamps = [r["synced_at"] for r in records if r.get("synced_at")]
+        if stamps:
+            self.store.set_pulled_until(email, max(stamps + ([since] if since else [])))
+        elif since is None:
+            # Only pre-sync records so far; later pulls fetch whatever gets a synced_at
+            self.store.set_pulled_until(email, datetime(1970, 1, 1, tzinfo=timezone.utc))
+
+    def _run(self):
+        while not self._closed:
+            try:
+                self.sync_once()
+            except Exception as e:
+                self.failures += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** (self.failures - 1)))
+                logger.warning("Scan sync failed (%s), retrying in %.1fs", e, delay)
+            else:
+                self.failures = 0
+                self.last_success = datetime.now(timezone.utc)
+                delay = self.interval
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+
+        # One last push on shutdown, unless the link was already failing
+        if self.failures:
+            return
+        try:
+            self.push()
+        except Exception:
+            pass
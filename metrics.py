@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED
+
+PREFIX = "leafsense_"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_collectors = []
+enabled = METRICS_ENABLED
+
+
+# ---------- RECORDING ----------
+
+class Histogram:
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name, amount=1, **labels):
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def register_collector(fn):
+    # fn() yields (name, labels, value) gauges, read at scrape time
+    _collectors.append(fn)
+
+
+class _Span:
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("stage_seconds", time.perf_counter() - self.start, stage=self.stage, **self.labels)
+        return False
+
+
+class _NoopSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def cache_gauges(cache):
+    stats = cache.stats()
+    for name in ("entries", "hits", "disk_hits", "misses"):
+        yield f"prediction_cache_{name}", {}, stats[name]
+
+
+def batcher_gauges(batcher):
+    stats = batcher.stats()
+    for crop, depth in stats["queue_depth"].items():
+        yield "batcher_queue_depth", {"crop": crop}, depth
+    for size, count in stats["batch_size_histogram"].items():
+        yield "batcher_batches", {"size": size}, count
+
+
+def span(stage, **labels):
+    # with span("predict", crop="Rice", model="1"): ...
+    return _Span(stage, labels) if enabled else _NOOP_SPAN
+
+
+# ---------- EXPORT ----------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def render_prometheus():
+    with _lock:
+        histograms = {key: (list(h.buckets), h.count, h.sum) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for (hname, labels), (buckets, count, total) in sorted(histograms.items()):
+            if hname != name:
+                continue
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}{name} counter")
+        for (cname, labels), value in sorted(counters.items()):
+            if cname == name:
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+    for collector in _collectors:
+        for name, labels, value in collector():
+            lines.append(f"{PREFIX}{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    with _lock:
+        histograms = [
+            {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+             "buckets": dict(zip(map(str, BUCKETS), h.buckets))}
+            for (name, labels), h in _histograms.items()
+        ]
+        counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _counters.items()]
+
+    gauges = [{"name": name, "labels": labels, "value": value} for collector in _collectors for name, labels, value in collector()]
+    return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render_prometheus().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    # Background /metrics and /metrics.json endpoint for processes without their own HTTP server
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+import metrics
+from assets import validate_class_names
+from config import IMG_SIZE, MODEL_MANIFEST, MAX_RESIDENT_MODELS, INFERENCE_BACKEND, TFLITE_QUANTIZATION
+
+
+# ---------- MANIFEST ----------
+
+@lru_cache(maxsize=None)
+def load_manifest(path=MODEL_MANIFEST):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+# ---------- REGISTRY ----------
+
+class ModelRegistry:
+    # Loads crop models on first use and keeps at most max_resident crops,
+    # evicting the least recently used one together with its ensemble members
+
+    def __init__(self, manifest_path=MODEL_MANIFEST, max_resident=MAX_RESIDENT_MODELS,
+                 backend=INFERENCE_BACKEND, quantization=TFLITE_QUANTIZATION):
+        self.manifest = load_manifest(manifest_path)
+        self.max_resident = max_resident
+        self.backend = backend
+        self.quantization = quantization
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {(crop, 0): threading.Lock() for crop in self.manifest}
+
+    def crops(self):
+        return list(self.manifest)
+
+    def is_loaded(self, crop):
+        return crop in self._models
+
+    def variant(self, crop):
+        # What actually serves the crop: manifest version, backend and, for TFLite, the
+        # quantisation. Cached predictions are keyed by it, so switching a crop to int8
+        # never serves results computed by the float32 model.
+        kind, quantization = self.backend_for(crop)
+        version = f"{self.manifest[crop].get('version', '1')}-{kind}"
+        return f"{version}-{quantization}" if kind == "tflite" else version
+
+    def tta_variant(self, crop, views, members):
+        # Cache version for high-accuracy results: the variant plus the TTA views and the
+        # first `members` checkpoints actually averaged (1 when the worker pool runs TTA)
+        entry = self.manifest[crop]
+        paths = [entry["path"], *entry.get("ensemble", ())][:members]
+        digest = hashlib.sha256(json.dumps([list(views), paths]).encode()).hexdigest()[:12]
+        return f"{self.variant(crop)}:tta-{digest}"
+
+    def backend_for(self, crop):
+        # A crop can pin its own backend/variant, e.g. a quantised model from optimize_models.py
+        entry = self.manifest[crop]
+        return entry.get("backend", self.backend), entry.get("quantization", self.quantization)
+
+    def ensemble_size(self, crop):
+        # The crop's own model plus any extra checkpoints listed under "ensemble"
+        return 1 + len(self.manifest[crop].get("ensemble", ()))
+
+    def get(self, crop, member=0):
+        if crop not in self.manifest:
+            raise KeyError(f"Unknown crop: {crop}")
+
+        with self._lock:
+            model = self._cached(crop, member)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault((crop, member), threading.Lock())
+
+        # Loading happens outside the registry lock so other crops stay available
+        with load_lock:
+            with self._lock:
+                model = self._cached(crop, member)
+                if model is not None:
+                    return model
+
+            try:
+                with metrics.span("model_load", crop=crop):
+                    model = self._load(crop, member)
+            except Exception:
+                metrics.inc("model_load_failures_total", crop=crop)
+                raise
+
+            with self._lock:
+                # Members live in their crop's slot, so an ensemble never evicts itself
+                self._models.setdefault(crop, {})[member] = model
+                self._models.move_to_end(crop)
+                while len(self._models) > self.max_resident:
+                    self._models.popitem(last=False)
+            return model
+
+    def _cached(self, crop, member):
+        # Caller holds self._lock
+        members = self._models.get(crop)
+        if members is None or member not in members:
+            return None
+        self._models.move_to_end(crop)
+        return members[member]
+
+    def evict(self, crop):
+        with self._lock:
+            self._models.pop(crop, None)
+
+    def _load(self, crop, member=0):
+        from backends import artifact_path, make_backend
+
+        entry = self.manifest[crop]
+        path = entry["path"] if member == 0 else entry["ensemble"][member - 1]
+        if not os.path.exists(path):
+            raise FileNotFoundError(2, "model file not found", path)
+
+        kind, quantization = self.backend_for(crop)
+
+        if kind == "tflite" and os.path.exists(artifact_path(path, f"_{quantization}.tflite")):
+            # Already converted, so neither the Keras model nor TensorFlow needs to be in memory
+            model = None
+        else:
+            import tensorflow as tf
+
+            model = tf.keras.models.load_model(path, compile=False, safe_mode=False)
+            # Force build to avoid Keras graph bugs
+            model.build((None, IMG_SIZE, IMG_SIZE, 3))
+        backend = make_backend(model, kind, path, quantization)
+
+        # Warm up so the first real request does not pay for tracing/allocation,
+        # and make sure the class list matches what the model predicts
+        preds = backend.predict(np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32))
+        validate_class_names(crop, entry["classes"], preds.shape[-1])
+        return backend
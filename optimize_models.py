@@ -0,0 +1,142 @@
+"""Build post-training-quantised TFLite variants of a crop model and report the trade-offs.
+
+    python optimize_models.py --crop Rice --dataset datasets/rice_val
+    python optimize_models.py --crop Pulses --dataset datasets/pulses_val --prune 0.5
+
+Variants are written next to the .keras file with the names the tflite backend
+looks for (e.g. models/rice_model1_int8.tflite). To serve one, set "backend":
+"tflite" and "quantization": "<variant>" on the crop's entry in static/models.json.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+
+from config import IMG_SIZE
+from model_registry import load_manifest
+
+VARIANTS = ("float32", "dynamic", "float16", "int8")
+
+
+def representative_samples(images, count=100):
+    # Evenly spaced, normalised samples from a tensor_dataset memmap for int8 calibration
+    picks = np.linspace(0, len(images) - 1, num=min(count, len(images))).astype(int)
+    return [np.asarray(images[i], dtype=np.float32) / 255.0 for i in picks]
+
+
+def prune_weights(model, sparsity):
+    # One-shot magnitude pruning of conv/dense kernels, without fine-tuning
+    import tensorflow as tf
+
+    pruned = tf.keras.models.clone_model(model)
+    pruned.set_weights(model.get_weights())
+    for layer in pruned.layers:
+        if not hasattr(layer, "kernel"):
+            continue
+        kernel = layer.kernel.numpy()
+        threshold = np.quantile(np.abs(kernel), sparsity)
+        layer.kernel.assign(np.where(np.abs(kernel) < threshold, 0.0, kernel).astype(kernel.dtype))
+    return pruned
+
+
+def file_sizes(path):
+    # Raw size, and gzip size, which is what pruning actually shrinks
+    with open(path, "rb") as f:
+        data = f.read()
+    return len(data) / 1e6, len(gzip.compress(data, compresslevel=6)) / 1e6
+
+
+def single_image_latency(backend, runs):
+    sample = np.random.default_rng(0).random((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    backend.predict(sample)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(sample)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50))
+
+
+def optimize(crop, dataset_dir=None, prune=None, runs=20, calibration=100):
+    import tensorflow as tf
+
+    from backends import TFFunctionBackend, TFLiteBackend, artifact_path
+    from tensor_dataset import evaluate, load
+
+    path = load_manifest()[crop]["path"]
+    model = tf.keras.models.load_model(path, compile=False, safe_mode=False)
+    model.build((None, IMG_SIZE, IMG_SIZE, 3))
+
+    if dataset_dir:
+        images, labels, index = load(dataset_dir)
+        num_classes = len(index["classes"])
+        representative = representative_samples(images, calibration)
+    else:
+        # Without real images agreement is only a sanity check and int8 cannot be calibrated
+        images = (np.random.default_rng(0).random((64, IMG_SIZE, IMG_SIZE, 3)) * 255).astype(np.uint8)
+        labels = np.zeros(len(images), dtype=np.int32)
+        num_classes = model.output_shape[-1]
+        representative = None
+
+    reference = evaluate(TFFunctionBackend(model), images, labels, num_classes)
+    size, gz_size = file_sizes(path)
+    rows = [{
+        "variant": "keras",
+        "size_mb": size,
+        "gzip_mb": gz_size,
+        "p50_ms": single_image_latency(TFFunctionBackend(model), runs),
+        "top1_agreement": 1.0,
+        "accuracy": reference["accuracy"] if dataset_dir else None,
+    }]
+
+    candidates = [(variant, model, variant) for variant in VARIANTS]
+    if prune:
+        candidates.append((f"pruned{int(prune * 100)}_dynamic", prune_weights(model, prune), "dynamic"))
+
+    for name, source_model, quantization in candidates:
+        if quantization == "int8" and representative is None:
+            print(f"skipping {name}: int8 calibration needs --dataset")
+            continue
+
+        tflite_path = artifact_path(path, f"_{name}.tflite")
+        if os.path.exists(tflite_path):
+            os.remove(tflite_path)
+        backend = TFLiteBackend(source_model, tflite_path, quantization, representative)
+
+        result = evaluate(backend, images, labels, num_classes)
+        size, gz_size = file_sizes(tflite_path)
+        rows.append({
+            "variant": name,
+            "size_mb": size,
+            "gzip_mb": gz_size,
+            "p50_ms": single_image_latency(backend, runs),
+            "top1_agreement": float(np.mean(result["predictions"] == reference["predictions"])),
+            "accuracy": result["accuracy"] if dataset_dir else None,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crop", required=True, choices=list(load_manifest()))
+    parser.add_argument("--dataset", help="tensor_dataset directory for calibration and agreement")
+    parser.add_argument("--prune", type=float, help="also build a magnitude-pruned dynamic-range variant at this sparsity")
+    parser.add_argument("--calibration", type=int, default=100, help="representative images for int8")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args()
+
+    report = optimize(args.crop, args.dataset, args.prune, args.runs, args.calibration)
+
+    print(f"{'variant':<18} {'size_mb':>8} {'gzip_mb':>8} {'p50_ms':>8} {'agree':>7} {'accuracy':>9}")
+    for row in report:
+        accuracy = f"{row['accuracy'] * 100:>8.2f}%" if row["accuracy"] is not None else f"{'-':>9}"
+        print(f"{row['variant']:<18} {row['size_mb']:>8.2f} {row['gzip_mb']:>8.2f} {row['p50_ms']:>8.2f} "
+              f"{row['top1_agreement']:>7.3f} {accuracy}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from config import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_PATH
+
+# Every cached entry holds this many predictions, whatever k the request asked for;
+# callers slice it, so a small-k request never leaves a short entry behind
+CACHED_TOP_K = 10
+
+
+def image_key(crop, version, image):
+    # Hash the decoded pixels, not the upload, so re-encoded copies of the same photo still hit
+    rgb = image.convert("RGB")
+    digest = hashlib.sha256()
+    digest.update(f"{rgb.width}x{rgb.height}".encode())
+    digest.update(rgb.tobytes())
+    return f"{crop}:{version}:top{CACHED_TOP_K}:{digest.hexdigest()}"
+
+
+class PredictionCache:
+    # Bounded LRU of top-k predictions with an optional SQLite tier behind it
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, disk_path=PREDICTION_CACHE_PATH):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, top TEXT NOT NULL)")
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT top FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row:
+                    top = [tuple(item) for item in json.loads(row[0])]
+                    self._remember(key, top)
+                    self.disk_hits += 1
+                    return top
+
+            self.misses += 1
+            return None
+
+    def put(self, key, top):
+        # top is a list of (class index, probability) pairs, best first
+        top = [(int(i), float(p)) for i, p in top]
+        with self._lock:
+            self._remember(key, top)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO predictions (key, top) VALUES (?, ?)", (key, json.dumps(top)))
+                self._db.commit()
+
+    def _remember(self, key, top):
+        self._entries[key] = top
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
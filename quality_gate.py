@@ -0,0 +1,76 @@
+import numpy as np
+
+import metrics
+from config import QUALITY_MIN_SIDE, QUALITY_MIN_SHARPNESS, QUALITY_MAX_DARK, QUALITY_MAX_BRIGHT, QUALITY_MIN_PLANT
+
+REJECTED = "Rejected by quality gate"
+
+# Side of the square copy the checks run on; thresholds in config are calibrated at this size
+GATE_SIZE = 128
+
+# Grey levels counted as crushed shadows / blown highlights
+DARK_LEVEL = 16
+BRIGHT_LEVEL = 240
+
+# OpenCV HSV (hue 0-180): yellow through green, with enough colour and light to
+# be foliage rather than grey background; yellow keeps chlorotic leaves in
+PLANT_HSV_LOW = (20, 40, 40)
+PLANT_HSV_HIGH = (90, 255, 255)
+
+
+def downscale(image):
+    # Integer box reduction in PIL, then a bilinear resize of what is left;
+    # well under a millisecond even for draft-decoded 12 MP photos
+    import cv2
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    factor = min(image.size) // GATE_SIZE
+    if factor > 1:
+        image = image.reduce(factor)
+    return cv2.resize(np.asarray(image), (GATE_SIZE, GATE_SIZE), interpolation=cv2.INTER_LINEAR)
+
+
+def assess(pixels, size):
+    # pixels: the (GATE_SIZE, GATE_SIZE, 3) uint8 copy; size: (width, height) as decoded.
+    # Every check is one vectorised OpenCV pass over 16k pixels.
+    import cv2
+
+    gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel() / gray.size
+    hsv = cv2.cvtColor(pixels, cv2.COLOR_RGB2HSV)
+
+    report = {
+        "width": size[0],
+        "height": size[1],
+        "sharpness": float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+        "dark": float(hist[:DARK_LEVEL].sum()),
+        "bright": float(hist[BRIGHT_LEVEL:].sum()),
+        "plant": cv2.countNonZero(cv2.inRange(hsv, PLANT_HSV_LOW, PLANT_HSV_HIGH)) / gray.size,
+    }
+
+    reasons = []
+    if min(size) < QUALITY_MIN_SIDE:
+        reasons.append("too small")
+    if report["sharpness"] < QUALITY_MIN_SHARPNESS:
+        reasons.append("blurry")
+    if report["dark"] > QUALITY_MAX_DARK:
+        reasons.append("underexposed")
+    if report["bright"] > QUALITY_MAX_BRIGHT:
+        reasons.append("overexposed")
+    if report["plant"] < QUALITY_MIN_PLANT:
+        reasons.append("no leaf found")
+
+    for reason in reasons:
+        metrics.inc("quality_rejections_total", reason=reason)
+    report["reasons"] = reasons
+    report["ok"] = not reasons
+    return report
+
+
+def check_image(image):
+    return assess(downscale(image), image.size)
+
+
+def describe_rejection(report):
+    return f"{REJECTED}: {', '.join(report['reasons'])}"
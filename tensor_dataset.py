@@ -0,0 +1,170 @@
+"""Preprocessed, memory-mapped evaluation sets.
+
+Build once from a folder with one sub-folder per class (named as in the crop's
+static/*_classes.txt), then evaluate as often as needed without decoding JPEGs:
+
+    python tensor_dataset.py build --crop Rice val_images/ datasets/rice_val
+    python tensor_dataset.py eval datasets/rice_val
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bulk_scan import decode
+from config import IMG_SIZE
+from inference import BATCH_SIZE, IMAGE_EXTENSIONS, get_class_names
+
+IMAGES_FILE = "images.npy"
+LABELS_FILE = "labels.npy"
+INDEX_FILE = "index.json"
+
+
+# ---------- BUILD ----------
+
+def list_labelled_images(folder, class_names):
+    lookup = {name.lower(): i for i, name in enumerate(class_names)}
+    files, labels, unknown = [], [], []
+
+    for class_dir in sorted(os.listdir(folder)):
+        path = os.path.join(folder, class_dir)
+        if not os.path.isdir(path):
+            continue
+        if class_dir.lower() not in lookup:
+            unknown.append(class_dir)
+            continue
+        for filename in sorted(os.listdir(path)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(os.path.join(class_dir, filename))
+                labels.append(lookup[class_dir.lower()])
+
+    if unknown:
+        raise ValueError(f"Folders not in the class list: {', '.join(unknown)}")
+    return files, labels
+
+
+def build(folder, out_dir, crop, workers=os.cpu_count() or 1):
+    class_names = get_class_names(crop)
+    files, labels = list_labelled_images(folder, class_names)
+    os.makedirs(out_dir, exist_ok=True)
+
+    images = np.lib.format.open_memmap(os.path.join(out_dir, IMAGES_FILE), mode="w+", dtype=np.uint8,
+                                       shape=(len(files), IMG_SIZE, IMG_SIZE, 3))
+    keep = np.ones(len(files), dtype=bool)
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, (pixels, error) in enumerate(pool.map(decode, (os.path.join(folder, f) for f in files))):
+            if error is None:
+                images[i] = pixels
+            else:
+                keep[i] = False
+                errors.append({"file": files[i], "error": error})
+    images.flush()
+    del images
+
+    if not keep.all():
+        # Compact away the images that failed to decode
+        source = np.load(os.path.join(out_dir, IMAGES_FILE), mmap_mode="r")
+        compact = np.lib.format.open_memmap(os.path.join(out_dir, IMAGES_FILE + ".tmp"), mode="w+", dtype=np.uint8,
+                                            shape=(int(keep.sum()), IMG_SIZE, IMG_SIZE, 3))
+        compact[:] = source[keep]
+        compact.flush()
+        del source, compact
+        os.replace(os.path.join(out_dir, IMAGES_FILE + ".tmp"), os.path.join(out_dir, IMAGES_FILE))
+
+    np.save(os.path.join(out_dir, LABELS_FILE), np.asarray(labels, dtype=np.int32)[keep])
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump({
+            "crop": crop,
+            "classes": list(class_names),
+            "files": [name for name, ok in zip(files, keep) if ok],
+            "errors": errors,
+        }, f, indent=2)
+    return int(keep.sum()), errors
+
+
+# ---------- EVALUATE ----------
+
+def load(out_dir):
+    images = np.load(os.path.join(out_dir, IMAGES_FILE), mmap_mode="r")
+    labels = np.load(os.path.join(out_dir, LABELS_FILE))
+    with open(os.path.join(out_dir, INDEX_FILE), "r") as f:
+        index = json.load(f)
+    return images, labels, index
+
+
+def iter_batches(images, batch_size=BATCH_SIZE):
+    # Slices of the memmap are views, so the only copy is normalising into the reused buffer
+    buffer = np.empty((batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        np.divide(chunk, np.float32(255.0), out=buffer[:len(chunk)], dtype=np.float32)
+        yield start, buffer[:len(chunk)]
+
+
+def evaluate(backend, images, labels, num_classes, batch_size=BATCH_SIZE):
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    predictions = np.empty(len(images), dtype=np.int32)
+    start = time.perf_counter()
+
+    for offset, batch in iter_batches(images, batch_size):
+        predicted = np.argmax(np.asarray(backend.predict(batch)), axis=1)
+        predictions[offset:offset + len(batch)] = predicted
+        np.add.at(confusion, (labels[offset:offset + len(batch)], predicted), 1)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "accuracy": float(np.trace(confusion) / max(1, confusion.sum())),
+        "confusion": confusion,
+        "predictions": predictions,
+        "images_per_sec": len(images) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_report(result, class_names):
+    confusion = result["confusion"]
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    diagonal = np.diag(confusion)
+
+    print(f"accuracy {result['accuracy'] * 100:.2f}%  ({result['images_per_sec']:.1f} images/sec)\n")
+    print(f"{'class':<36} {'precision':>9} {'recall':>7} {'support':>8}")
+    for i, name in enumerate(class_names):
+        precision = diagonal[i] / predicted[i] if predicted[i] else 0.0
+        recall = diagonal[i] / support[i] if support[i] else 0.0
+        print(f"{name:<36} {precision:>9.3f} {recall:>7.3f} {support[i]:>8}")
+
+    print("\nconfusion (rows = true, columns = predicted)")
+    for i, row in enumerate(confusion):
+        print(f"{i:>3} " + " ".join(f"{n:>5}" for n in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="convert an image folder into a memory-mapped dataset")
+    build_parser.add_argument("--crop", required=True)
+    build_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    build_parser.add_argument("folder")
+    build_parser.add_argument("out_dir")
+
+    eval_parser = commands.add_parser("eval", help="evaluate the crop's model on a built dataset")
+    eval_parser.add_argument("out_dir")
+    eval_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count, failed = build(args.folder, args.out_dir, args.crop, args.workers)
+        print(f"wrote {count} images to {args.out_dir}, {len(failed)} failed to decode")
+    else:
+        from model_registry import ModelRegistry
+
+        images, labels, index = load(args.out_dir)
+        backend = ModelRegistry().get(index["crop"])
+        print_report(evaluate(backend, images, labels, len(index["classes"]), args.batch_size), index["classes"])
@@ -0,0 +1,65 @@
+import numpy as np
+
+from batcher import padded_size
+from config import IMG_SIZE, TTA_VIEWS
+from inference import BATCH_SIZE, resize_to_model
+
+
+# ---------- VIEWS ----------
+
+def _center_crop(image, fraction):
+    # Cropped from the full-resolution image, so zoomed views keep real detail
+    width, height = image.size
+    w, h = int(width * fraction), int(height * fraction)
+    left, top = (width - w) // 2, (height - h) // 2
+    return resize_to_model(image.crop((left, top, left + w, top + h)))
+
+
+def augmented_views(image, views=TTA_VIEWS):
+    # (len(views), 224, 224, 3) uint8; a view is "identity", "hflip", "vflip",
+    # "hvflip" or "cropNN" (central NN%), optionally prefixed "hflip_"
+    crops = {}
+    out = np.empty((len(views), IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+
+    for i, view in enumerate(views):
+        flip = None
+        if view.startswith("hflip_"):
+            flip, view = "hflip", view[len("hflip_"):]
+
+        if view.startswith("crop"):
+            fraction = int(view[len("crop"):]) / 100
+            if fraction not in crops:
+                crops[fraction] = _center_crop(image, fraction)
+            pixels = crops[fraction]
+        elif view in ("identity", "hflip", "vflip", "hvflip"):
+            if 1.0 not in crops:
+                crops[1.0] = resize_to_model(image)
+            pixels = crops[1.0]
+            flip = None if view == "identity" else view
+        else:
+            raise ValueError(f"Unknown TTA view: {view}")
+
+        if flip in ("hflip", "hvflip"):
+            pixels = pixels[:, ::-1]
+        if flip in ("vflip", "hvflip"):
+            pixels = pixels[::-1]
+        out[i] = pixels
+    return out
+
+
+# ---------- PREDICTION ----------
+
+def predict_tta(backends, image, views=TTA_VIEWS):
+    # Mean probabilities over every view and every ensemble member; each member
+    # sees all views in one forward pass, padded to a power of two so the
+    # backends only ever meet a few batch shapes
+    pixels = augmented_views(image, views)
+    batch = np.zeros((padded_size(len(views), max(BATCH_SIZE, len(views))), IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    np.divide(pixels, np.float32(255.0), out=batch[:len(views)], dtype=np.float32)
+
+    probs = [np.asarray(backend.predict(batch))[:len(views)].mean(axis=0) for backend in backends]
+    return np.mean(probs, axis=0)
+
+
+def ensemble_members(registry, crop):
+    return [registry.get(crop, member) for member in range(registry.ensemble_size(crop))]
@@ -1,73 +1,193 @@
-from firebase_config import auth
+from datetime import datetime, timezone
 
-from firestore_db import db
-from firebase_admin import firestore
+from auth_session import SessionStore, verify_with_admin
+from local_store import FirestoreBackend, LocalStore, SyncWorker
 
 
-from datetime import datetime
+# ---------- FIREBASE AUTH ----------
 
+_auth = None
 
-# ---------- FIREBASE AUTH ----------
+
+def get_auth():
+
+    # pyrebase is imported and initialised on first use, not when the login page loads
+    global _auth
+
+    if _auth is None:
+        from firebase_config import auth
+        _auth = auth
+
+    return _auth
 
 def register_user(email, password):
 
     try:
         if len(password) < 6:
             return False, "Password should be at least 6 characters"
-        auth.create_user_with_email_and_password(email, password)
+        get_auth().create_user_with_email_and_password(email, password)
         return True, "Registration Successful"
 
     except Exception as e:
         return False, str(e)
 
 
+_session_store = None
+
+
+def get_session_store():
+
+    global _session_store
+
+    if _session_store is None:
+        _session_store = SessionStore(get_auth(), verify=_verify_token)
+
+    return _session_store
+
+
+def _verify_token(id_token):
+
+    # firebase_admin must be initialised (firestore_db does it) before it can verify
+    get_db()
+    return verify_with_admin(id_token)
+
+
 def authenticate_user(email, password):
 
     try:
-        user = auth.sign_in_with_email_and_password(email, password)
-        return True, user
+        session_id = get_session_store().sign_in(email, password)
+        return True, session_id
 
     except:
         return False, "Invalid email or password"
 
 
-# ---------- FIRESTORE HISTORY ----------
+def resume_session(session_id):
 
-def save_scan(email, plant, disease, confidence, status):
+    # Verified email for a session id from an earlier sign-in, without a network round trip
+    claims = get_session_store().resolve(session_id)
+
+    if not claims:
+        return None
+
+    # Signed-in users get their remote scans pulled into the local store
+    get_sync().track(claims["email"])
+
+    return claims.get("email")
+
+
+def issue_resume_ticket(session_id):
+
+    # Short-lived, single-use token for the page URL; the session id itself never goes there
+    return get_session_store().issue_ticket(session_id)
+
+
+def redeem_resume_ticket(ticket):
+
+    return get_session_store().redeem_ticket(ticket)
+
+
+def end_session(session_id):
+
+    get_session_store().revoke(session_id)
+
+
+# ---------- FIRESTORE ----------
+
+_db = None
 
-    user_ref = db.collection("users").document(email)
 
-    history_ref = user_ref.collection("history")
+def get_db():
 
-    history_ref.add({
-        "date": firestore.SERVER_TIMESTAMP,
+    # Imported on first use, so tests can set_db() a fake without Firebase credentials
+    global _db
+
+    if _db is None:
+        from firestore_db import db
+        _db = db
+
+    return _db
+
+
+def set_db(db):
+
+    global _db, _sync
+
+    if _sync is not None:
+        _sync.close()
+        _sync = None
+
+    _db = db
+
+
+# ---------- LOCAL STORE & SYNC ----------
+
+HISTORY_PAGE_SIZE = 50
+
+_store = None
+_sync = None
+
+
+def get_local_store():
+
+    global _store
+
+    if _store is None:
+        _store = LocalStore()
+
+    return _store
+
+
+def get_sync():
+
+    global _sync
+
+    if _sync is None:
+        # Only users with a live session are pulled, so sign-outs stop costing reads
+        _sync = SyncWorker(get_local_store(), FirestoreBackend(get_db()), active_users=get_session_store().active_emails)
+
+    return _sync
+
+
+def save_scan(email, plant, disease, confidence, status):
+
+    # Written locally first, so a scan never waits on the network; the sync
+    # worker pushes it to Firestore as soon as the link allows
+    get_local_store().add({
+        "email": email,
+        "date": datetime.now(timezone.utc),
         "plant": plant,
         "disease": disease,
         "confidence": confidence,
         "status": status
     })
 
+    get_sync().wake()
+
+
+def get_user_history(email, limit=HISTORY_PAGE_SIZE):
+
+    # The newest `limit` scans, from the local store
+    return get_local_store().history(email, limit)
+
+
+def has_more_history(email, shown):
+
+    return get_local_store().count(email) > shown
 
-def get_user_history(email):
 
-    history_ref = (
-        db.collection("users")
-        .document(email)
-        .collection("history")
-        .order_by("date", direction=firestore.Query.DESCENDING)
-    )
+def get_user_summary(email):
 
-    docs = history_ref.stream()
+    return get_local_store().summary(email)
 
-    history = []
 
-    for doc in docs:
+def warm_clients():
 
-        data = doc.to_dict()
+    # Imports and connects the Firebase clients ahead of the first sign-in
+    get_auth()
+    get_sync()
 
-        if data.get("date"):
-            data["date"] = data["date"].strftime("%Y-%m-%d %H:%M")
 
-        history.append(data)
+def pending_sync_count():
 
-    return history
+    return get_local_store().pending_count()
@@ -0,0 +1,208 @@
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+from config import IMG_SIZE, BATCHER_MAX_BATCH_SIZE, MODEL_MANIFEST, WORKER_POOL_SIZE
+
+# Upper bound on classes per model, sizes the shared output buffer
+MAX_CLASSES = 256
+
+
+def cpu_set():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def pool_registry(manifest_path=MODEL_MANIFEST):
+    # Workers serve the converted .tflite artifacts: the weights are mmapped, so
+    # the page cache shares them across workers, and with LiteRT installed no
+    # worker imports TensorFlow. Every crop stays resident.
+    from model_registry import ModelRegistry, load_manifest
+
+    return ModelRegistry(manifest_path, max_resident=len(load_manifest(manifest_path)), backend="tflite")
+
+
+def check_artifacts(registry):
+    # A Keras fallback would give every worker a private copy of every model, so refuse to start
+    from backends import artifact_path
+
+    missing = []
+    for crop in registry.crops():
+        kind, quantization = registry.backend_for(crop)
+        path = artifact_path(registry.manifest[crop]["path"], f"_{quantization}.tflite")
+        if kind != "tflite" or not os.path.exists(path):
+            missing.append(f"{crop} ({path})" if kind == "tflite" else f"{crop} (pinned to {kind})")
+    if missing:
+        raise RuntimeError("The inference worker pool serves converted TFLite models only; missing for "
+                           + ", ".join(missing) + ". Build them with optimize_models.py or turn the pool off.")
+
+
+# ---------- WORKER PROCESS ----------
+
+def _worker_main(conn, input_name, output_name, max_batch, cpus, preload, manifest_path):
+    # Pin the worker to its share of cores; the backends size their thread pools from the affinity mask
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    inputs = np.ndarray((max_batch, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32, buffer=input_shm.buf)
+    outputs = np.ndarray((max_batch, MAX_CLASSES), dtype=np.float32, buffer=output_shm.buf)
+
+    registry = pool_registry(manifest_path)
+    for crop in preload:
+        try:
+            registry.get(crop)
+        except Exception:
+            pass  # reported to the caller on the first request for that crop
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        crop, n = message
+        try:
+            preds = np.asarray(registry.get(crop).predict(inputs[:n]))
+            outputs[:n, :preds.shape[1]] = preds
+            conn.send(("ok", preds.shape[1]))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    del inputs, outputs
+    input_shm.close()
+    output_shm.close()
+
+
+class _Worker:
+
+    def __init__(self, ctx, max_batch, cpus, preload, manifest_path):
+        self.ctx = ctx
+        self.manifest_path = manifest_path
+        self.max_batch = max_batch
+        self.cpus = cpus
+        self.preload = preload
+        self.input_shm = shared_memory.SharedMemory(create=True, size=max_batch * IMG_SIZE * IMG_SIZE * 3 * 4)
+        self.output_shm = shared_memory.SharedMemory(create=True, size=max_batch * MAX_CLASSES * 4)
+        self.inputs = np.ndarray((max_batch, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32, buffer=self.input_shm.buf)
+        self.outputs = np.ndarray((max_batch, MAX_CLASSES), dtype=np.float32, buffer=self.output_shm.buf)
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.input_shm.name, self.output_shm.name, self.max_batch, self.cpus, self.preload,
+                  self.manifest_path),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def respawn(self):
+        # A fresh process on the same shared memory, for a worker that was OOM-killed or crashed
+        metrics.inc("inference_worker_restarts_total")
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self._start()
+
+    def run(self, crop, batch):
+        # Only (crop, n) crosses the pipe; the tensors go through shared memory
+        if not self.process.is_alive():
+            self.respawn()
+        n = len(batch)
+        self.inputs[:n] = batch
+        try:
+            self.conn.send((crop, n))
+            status, payload = self.conn.recv()
+        except (EOFError, OSError) as e:
+            # Died mid-request; this request fails, the next one gets a new process
+            pid = self.process.pid
+            self.respawn()
+            raise RuntimeError(f"Inference worker {pid} died: {type(e).__name__}") from e
+        if status != "ok":
+            raise RuntimeError(f"Inference worker failed: {payload}")
+        return self.outputs[:n, :payload].copy()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        del self.inputs, self.outputs
+        self.input_shm.close()
+        self.input_shm.unlink()
+        self.output_shm.close()
+        self.output_shm.unlink()
+
+
+# ---------- POOL ----------
+
+class _PoolBackend:
+
+    def __init__(self, pool, crop):
+        self.pool = pool
+        self.crop = crop
+
+    def predict(self, batch):
+        return self.pool.predict(self.crop, batch)
+
+
+class InferenceWorkerPool:
+    # Runs the crop models in separate processes so TensorFlow never holds the
+    # UI process's GIL; each call borrows one idle worker
+
+    def __init__(self, size=WORKER_POOL_SIZE, preload=(), max_batch=BATCHER_MAX_BATCH_SIZE, manifest_path=MODEL_MANIFEST):
+        check_artifacts(pool_registry(manifest_path))
+        cpus = cpu_set()
+        size = size or len(cpus)
+        self.max_batch = max_batch
+        self.size = size
+
+        # spawn, not fork: TensorFlow's runtime threads do not survive a fork
+        ctx = mp.get_context("spawn")
+        shares = [cpus[i::size] for i in range(size)] if size <= len(cpus) else [cpus] * size
+        self._workers = [_Worker(ctx, max_batch, shares[i], tuple(preload), manifest_path) for i in range(size)]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._closed = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def backend(self, crop):
+        return _PoolBackend(self, crop)
+
+    def predict(self, crop, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        outputs = []
+        for start in range(0, len(batch), self.max_batch):
+            worker = self._idle.get()
+            try:
+                outputs.append(worker.run(crop, batch[start:start + self.max_batch]))
+            finally:
+                self._idle.put(worker)
+        return np.concatenate(outputs, axis=0)
+
+    def pids(self):
+        return [worker.process.pid for worker in self._workers]
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self._workers:
+            worker.close()